@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database import MusicDatabase
+
+# AsyncMusicDatabase module - asyncio facade for MusicDatabase
+# Every MusicDatabase method is available as a coroutine that runs on a
+# dedicated thread pool, so queries never block the event loop. Each worker
+# thread reads through its own pooled connection; writes share the writer.
+#
+#   async with AsyncMusicDatabase() as db:
+#       songs = await db.get_all_songs()
+#       async for song in db.iter_songs(page_size=500):
+#           ...
+class AsyncMusicDatabase:
+    # Rows handed back to the event loop per trip to the worker thread
+    ITER_CHUNK = 256
+
+    def __init__(self, db_name: str = "music.db", profile: str = "durable",
+                 max_workers: int = 4):
+        self.db = MusicDatabase(db_name, profile)
+        self.max_workers = max_workers
+        self._executor = None
+
+    async def connect(self):
+        # Set up the pool & the executor - connections open lazily per thread
+        self.db.connect()
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="music-db")
+        return self
+
+    async def close(self):
+        # Wait for running queries, then close every pooled connection
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        self.db.close()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __getattr__(self, name):
+        # Mirror MusicDatabase - methods become coroutines & generator methods
+        # (iter_songs, ...) become async iterators
+        attr = getattr(self.db, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        if inspect.isgeneratorfunction(attr):
+            @functools.wraps(attr)
+            def iterate(*args, **kwargs):
+                return self._iterate(attr, *args, **kwargs)
+            return iterate
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self._run(attr, *args, **kwargs)
+        return call
+
+    async def _run(self, func, *args, **kwargs):
+        # Run func on the executor - cancelling the awaiting task interrupts
+        # the SQLite statement it's running instead of letting it finish:
+        # a write on the writer, while the call holds it, & a read on the
+        # worker thread's reader
+        if self._executor is None:
+            raise RuntimeError("AsyncMusicDatabase is not connected")
+        state = {"connection": None, "thread": None, "done": False}
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                state["connection"] = self.db.pool.reader()
+                state["thread"] = threading.get_ident()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    state["done"] = True
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, work)
+        except asyncio.CancelledError:
+            with lock:
+                if state["connection"] is not None and not state["done"]:
+                    self._interrupt(state["connection"], state["thread"])
+            raise
+
+    def _interrupt(self, reader, thread_id: int):
+        # Stop whatever the worker thread is running - the writer if it holds
+        # it (the write rolls back), otherwise the read on its own connection
+        if not self.db.pool.interrupt_writer(thread_id):
+            reader.interrupt()
+
+    async def _iterate(self, generator_func, *args, **kwargs):
+        # Drive a MusicDatabase generator from the event loop, ITER_CHUNK rows
+        # at a time. The generator lives on its own thread for its whole life,
+        # so any cursor it holds is only ever touched by that thread.
+        executor = ThreadPoolExecutor(1, thread_name_prefix="music-db-iter")
+        loop = asyncio.get_running_loop()
+        generator = None
+        connection = None
+        thread_id = None
+
+        def next_chunk():
+            nonlocal generator, connection, thread_id
+            if generator is None:
+                connection = self.db.pool.reader()
+                thread_id = threading.get_ident()
+                generator = generator_func(*args, **kwargs)
+            chunk = []
+            for row in generator:
+                chunk.append(row)
+                if len(chunk) >= self.ITER_CHUNK:
+                    break
+            return chunk
+
+        def finish():
+            if generator is not None:
+                generator.close()
+            self.db.pool.release_reader()
+
+        try:
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(executor, next_chunk)
+                except asyncio.CancelledError:
+                    if connection is not None:
+                        self._interrupt(connection, thread_id)
+                    raise
+                for row in chunk:
+                    yield row
+                if len(chunk) < self.ITER_CHUNK:
+                    break
+        finally:
+            # Runs on cancellation & early exit too - close the generator on its
+            # own thread before the thread goes away
+            executor.submit(finish)
+            executor.shutdown(wait=False)
@@ -0,0 +1,408 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from database import QUERIES, STATEMENT_CACHE_SIZE, MusicDatabase
+from library_generator import generate_library
+
+# Benchmark module - times every MusicDatabase operation against synthetic
+# libraries of several sizes & writes the results as JSON, so two runs
+# (e.g. before & after a change to database.py) can be compared.
+#
+#   python benchmark.py --sizes 10000 100000 --output after.json --compare before.json
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Songs linked to the artist deleted by the cascade benchmarks
+CASCADE_SONGS = 1000
+
+# Calls timed per variant by the statement microbenchmark
+STATEMENT_CALLS = 5000
+
+# A benchmark is a name, a run function to time, and an optional untimed
+# setup function whose return value is passed to run as arguments
+# w/ measure_memory the memory allocated by one run is recorded too
+class Benchmark:
+    def __init__(self, name: str, run, setup=None, measure_memory: bool = False):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.measure_memory = measure_memory
+
+def pick_samples(db: MusicDatabase):
+    # Typical existing names to look up - the busiest artist, year & category
+    connection = db.pool.reader()
+    return {
+        "artist": connection.execute("""
+            SELECT a.Name FROM Plays p JOIN Artist a ON p.ArtistID = a.ArtistID
+            GROUP BY p.ArtistID ORDER BY COUNT(*) DESC LIMIT 1""").fetchone()[0],
+        "category": connection.execute("""
+            SELECT c.CategoryName FROM IsIn ii JOIN Category c ON ii.CategoryID = c.CategoryID
+            GROUP BY ii.CategoryID ORDER BY COUNT(*) DESC LIMIT 1""").fetchone()[0],
+        "year": connection.execute("""
+            SELECT Year FROM Album GROUP BY Year ORDER BY COUNT(*) DESC LIMIT 1""").fetchone()[0],
+        "album": connection.execute("SELECT Title FROM Album ORDER BY AlbumID LIMIT 1").fetchone()[0],
+        "song": connection.execute("SELECT Title FROM Song ORDER BY SongID LIMIT 1").fetchone()[0],
+        "song_id": connection.execute("SELECT MIN(SongID) FROM Song").fetchone()[0],
+    }
+
+def database_benchmarks(db: MusicDatabase, samples: dict):
+    # One benchmark per public MusicDatabase operation
+    counter = itertools.count()
+
+    def unique(prefix: str):
+        return f"{prefix} {next(counter)}"
+
+    def cold(kind: str, name: str):
+        # Setup for uncached lookups - the query has to reach SQLite
+        def setup():
+            db.name_cache[kind].clear()
+            return (name,)
+        return setup
+
+    def existing(create, prefix: str, *extra):
+        # Setup that creates a fresh row & passes its name (plus extra args,
+        # called if callable) to run - for the update & delete benchmarks
+        def setup():
+            name = unique(prefix)
+            create(name)
+            return (name,) + tuple(arg() if callable(arg) else arg for arg in extra)
+        return setup
+
+    def new_link_target():
+        song_id = db.create_song(unique("Bench Song"))
+        artist_id = db.create_artist(unique("Bench Artist"))
+        category_id = db.create_category(unique("Bench Category"))
+        album_id = db.create_album(unique("Bench Album"), 2000)
+        return song_id, artist_id, category_id, album_id
+
+    def linked_target():
+        song_id, artist_id, category_id, album_id = new_link_target()
+        db.add_artist_to_song(song_id, artist_id)
+        db.add_category_to_song(song_id, category_id)
+        db.add_song_to_album(song_id, album_id)
+        return song_id, artist_id, category_id, album_id
+
+    return [
+        # Artists
+        Benchmark("create_artist", lambda: db.create_artist(unique("Bench Artist"))),
+        Benchmark("get_all_artists", db.get_all_artists),
+        Benchmark("get_artist_by_name", db.get_artist_by_name, cold("artist", samples["artist"])),
+        Benchmark("get_artist_by_name (cached)", lambda: db.get_artist_by_name(samples["artist"])),
+        Benchmark("find_artists", lambda: db.find_artists(samples["artist"][:4])),
+        Benchmark("update_artist_by_name", db.update_artist_by_name,
+                  existing(db.create_artist, "Bench Artist", lambda: unique("Renamed Artist"))),
+        Benchmark("delete_artist_by_name", db.delete_artist_by_name,
+                  existing(db.create_artist, "Bench Artist")),
+        # Categories
+        Benchmark("create_category", lambda: db.create_category(unique("Bench Category"))),
+        Benchmark("get_all_categories", db.get_all_categories),
+        Benchmark("get_category_by_name", db.get_category_by_name, cold("category", samples["category"])),
+        Benchmark("update_category_by_name", db.update_category_by_name,
+                  existing(db.create_category, "Bench Category", lambda: unique("Renamed Category"))),
+        Benchmark("delete_category_by_name", db.delete_category_by_name,
+                  existing(db.create_category, "Bench Category")),
+        # Albums
+        Benchmark("create_album", lambda: db.create_album(unique("Bench Album"), 2000)),
+        Benchmark("get_all_albums", db.get_all_albums),
+        Benchmark("get_album_by_name", db.get_album_by_name, cold("album", samples["album"])),
+        Benchmark("update_album_by_name", db.update_album_by_name,
+                  existing(lambda title: db.create_album(title, 2000), "Bench Album",
+                           lambda: unique("Renamed Album"), 2001)),
+        Benchmark("delete_album_by_name", db.delete_album_by_name,
+                  existing(lambda title: db.create_album(title, 2000), "Bench Album")),
+        # Songs
+        Benchmark("create_song", lambda: db.create_song(unique("Bench Song"))),
+        Benchmark("create_song_with_links",
+                  lambda s, a, c, al: db.create_song_with_links(unique("Bench Song"), [a], [al], [c]),
+                  new_link_target),
+        Benchmark("get_all_songs", db.get_all_songs),
+        Benchmark("get_songs_page", lambda: db.get_songs_page(None, 50)),
+        Benchmark("get_song_by_name", lambda: db.get_song_by_name(samples["song"])),
+        Benchmark("update_song_by_name", db.update_song_by_name,
+                  existing(db.create_song, "Bench Song", lambda: unique("Renamed Song"))),
+        Benchmark("delete_song_by_name", db.delete_song_by_name,
+                  existing(db.create_song, "Bench Song")),
+        # Links
+        Benchmark("add_artist_to_song", lambda s, a, c, al: db.add_artist_to_song(s, a), new_link_target),
+        Benchmark("remove_artist_from_song", lambda s, a, c, al: db.remove_artist_from_song(s, a), linked_target),
+        Benchmark("get_artists_for_song", lambda: db.get_artists_for_song(samples["song_id"])),
+        Benchmark("add_category_to_song", lambda s, a, c, al: db.add_category_to_song(s, c), new_link_target),
+        Benchmark("remove_category_from_song", lambda s, a, c, al: db.remove_category_from_song(s, c), linked_target),
+        Benchmark("get_categories_for_song", lambda: db.get_categories_for_song(samples["song_id"])),
+        Benchmark("add_song_to_album", lambda s, a, c, al: db.add_song_to_album(s, al), new_link_target),
+        Benchmark("remove_song_from_album", lambda s, a, c, al: db.remove_song_from_album(s, al), linked_target),
+        Benchmark("get_albums_for_song", lambda: db.get_albums_for_song(samples["song_id"])),
+        # Reports & search
+        Benchmark("see_all_songs_played_by_artist",
+                  lambda: db.see_all_songs_played_by_artist(samples["artist"])),
+        Benchmark("get_artist_discography",
+                  lambda: db.get_artist_discography(samples["artist"], use_cache=False)),
+        Benchmark("get_artist_discography (cached)",
+                  lambda: db.get_artist_discography(samples["artist"])),
+        Benchmark("see_all_artists_with_albums_in_year",
+                  lambda: db.see_all_artists_with_albums_in_year(samples["year"])),
+        Benchmark("see_all_albums_in_category",
+                  lambda: db.see_all_albums_in_category(samples["category"])),
+        Benchmark("stream_songs_played_by_artist (first row)",
+                  lambda: next(db.stream_songs_played_by_artist(samples["artist"]), None)),
+        Benchmark("stream_artists_with_albums_in_year (first row)",
+                  lambda: next(db.stream_artists_with_albums_in_year(samples["year"]), None)),
+        Benchmark("stream_albums_in_category (first row)",
+                  lambda: next(db.stream_albums_in_category(samples["category"]), None)),
+        Benchmark("search", lambda: db.search(samples["artist"][:4])),
+    ]
+
+def row_format_benchmarks(db: MusicDatabase, samples: dict):
+    # Large listings in every row format - sqlite3.Row vs tuples
+    benchmarks = []
+    for row_format in MusicDatabase.ROW_FORMATS:
+        benchmarks += [
+            Benchmark(f"get_all_songs [{row_format}]",
+                      lambda f=row_format: db.get_all_songs(row_format=f), measure_memory=True),
+            Benchmark(f"get_all_albums [{row_format}]",
+                      lambda f=row_format: db.get_all_albums(row_format=f), measure_memory=True),
+            Benchmark(f"see_all_albums_in_category [{row_format}]",
+                      lambda f=row_format: db.see_all_albums_in_category(samples["category"], row_format=f),
+                      measure_memory=True),
+        ]
+    return benchmarks
+
+def cascade_benchmarks(db: MusicDatabase, samples: dict):
+    # Deletes that cascade to Plays/IsOn/IsIn - a linked song, an artist w/
+    # CASCADE_SONGS songs & CASCADE_SONGS songs at once - plus the orphan scan
+    counter = itertools.count()
+    artist_id = db.get_artist_by_name(samples["artist"])['ArtistID']
+    album_id = db.get_album_by_name(samples["album"])['AlbumID']
+    category_id = db.get_category_by_name(samples["category"])['CategoryID']
+
+    def linked_songs(count: int, artist: int = artist_id):
+        # Create count songs linked to an artist, album & category in one transaction
+        titles = [f"Cascade Song {next(counter)}" for _ in range(count)]
+        with db.pool.writer():
+            for title in titles:
+                db.create_song_with_links(title, [artist], [album_id], [category_id])
+        return titles
+
+    def busy_artist():
+        name = f"Cascade Artist {next(counter)}"
+        linked_songs(CASCADE_SONGS, db.create_artist(name))
+        return (name,)
+
+    return [
+        Benchmark("delete_song_by_name (cascade)", db.delete_song_by_name,
+                  lambda: (linked_songs(1)[0],)),
+        Benchmark(f"delete_artist_by_name ({CASCADE_SONGS} songs)", db.delete_artist_by_name,
+                  busy_artist),
+        Benchmark(f"delete_many ({CASCADE_SONGS} songs)",
+                  lambda titles: db.delete_many("song", titles), lambda: (linked_songs(CASCADE_SONGS),)),
+        Benchmark("find_orphan_links", db.find_orphan_links),
+    ]
+
+def statement_microbenchmark(db: MusicDatabase, samples: dict, calls: int = STATEMENT_CALLS):
+    # Per-call cost (µs) of a by-name lookup & a link insert, against the
+    # baseline - sqlite3's default statement cache & a new cursor per call:
+    # - reusing one cursor for every call instead
+    # - w/ as many distinct statements in flight as STATEMENT_CACHE_SIZE (every
+    #   registry query & run-time shape a long session compiles), cycled on a
+    #   default cache & on one sized to STATEMENT_CACHE_SIZE
+    # The insert repeats a link that already exists, so INSERT OR IGNORE
+    # writes nothing & no trigger cost is timed.
+    lookup = QUERIES["artist.by_name"]
+    insert = QUERIES["plays.insert"]
+    name = samples["artist"]
+    link = db.pool.reader().execute("SELECT SongID, ArtistID FROM Plays LIMIT 1").fetchone()
+    link = (link[0], link[1])
+
+    def timed(connection: sqlite3.Connection, statements: list, params: tuple, reuse: bool = False):
+        # Runs in a transaction that's rolled back, so nothing is kept
+        shared = connection.cursor()
+        start = time.perf_counter()
+        for i in range(calls):
+            cursor = shared if reuse else connection.cursor()
+            cursor.execute(statements[i % len(statements)], params).fetchone()
+        elapsed = time.perf_counter() - start
+        if connection.in_transaction:
+            connection.rollback()
+        return elapsed * 1e6 / calls
+
+    def working_set(sql: str):
+        # Distinct texts of one statement - each is compiled & cached apart
+        return [f"{sql} -- {i}" for i in range(STATEMENT_CACHE_SIZE)]
+
+    results = {"calls": calls, "statement_cache_size": STATEMENT_CACHE_SIZE}
+    default = sqlite3.connect(db.db_name)
+    sized = sqlite3.connect(db.db_name, cached_statements=STATEMENT_CACHE_SIZE)
+    try:
+        for kind, sql, params in (("lookup", lookup, (name,)), ("link_insert", insert, link)):
+            results[f"{kind}_baseline_us"] = timed(default, [sql], params)
+            results[f"{kind}_reused_cursor_us"] = timed(default, [sql], params, reuse=True)
+            results[f"{kind}_default_cache_us"] = timed(default, working_set(sql), params)
+            results[f"{kind}_sized_cache_us"] = timed(sized, working_set(sql), params)
+    finally:
+        default.close()
+        sized.close()
+    return results
+
+def memory_benchmark(benchmark: Benchmark):
+    # Memory held by one run's result & the peak while building it
+    args = benchmark.setup() if benchmark.setup else ()
+    tracemalloc.start()
+    try:
+        result = benchmark.run(*args)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rows = len(result) if isinstance(result, list) else None
+    return {
+        "retained_kb": retained / 1024,
+        "peak_kb": peak / 1024,
+        "bytes_per_row": retained / rows if rows else None,
+    }
+
+def time_benchmark(benchmark: Benchmark, repeat: int):
+    # Run one benchmark repeat times - only run() is timed
+    times = []
+    rows = None
+    for _ in range(repeat):
+        args = benchmark.setup() if benchmark.setup else ()
+        start = time.perf_counter()
+        result = benchmark.run(*args)
+        times.append((time.perf_counter() - start) * 1000)
+        if isinstance(result, list):
+            rows = len(result)
+    return {
+        "repeat": repeat,
+        "rows": rows,
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "max_ms": max(times),
+    }
+
+def table_counts(db: MusicDatabase):
+    connection = db.pool.reader()
+    return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ["Artist", "Category", "Album", "Song", "Plays", "IsOn", "IsIn"]}
+
+def run_size(size: int, workdir: str, repeat: int, reuse: bool, only: list):
+    # Build (or reuse) a library of size songs & time every benchmark on it
+    path = os.path.join(workdir, f"library_{size}.db")
+    generated = None
+    if not (reuse and os.path.exists(path)):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        db = MusicDatabase(path, profile="throughput")
+        db.connect()
+        db.initialize_database()
+        stats = generate_library(db, size)
+        generated = {"seconds": stats["seconds"], "rows_per_sec": stats["rows_per_sec"]}
+        db.close()
+
+    db = MusicDatabase(path, profile="durable")
+    db.connect()
+    db.initialize_database()
+    results = {"counts": table_counts(db), "orphans": db.find_orphan_links(), "generate": generated,
+               "operations": {}, "memory": {}}
+    samples = pick_samples(db)
+    benchmarks = (database_benchmarks(db, samples) + row_format_benchmarks(db, samples)
+                  + cascade_benchmarks(db, samples))
+    for benchmark in benchmarks:
+        if only and benchmark.name not in only:
+            continue
+        results["operations"][benchmark.name] = time_benchmark(benchmark, repeat)
+        timing = results["operations"][benchmark.name]
+        line = f"  {benchmark.name:<40} median {timing['median_ms']:10.3f} ms"
+        if benchmark.measure_memory:
+            results["memory"][benchmark.name] = memory_benchmark(benchmark)
+            memory = results["memory"][benchmark.name]
+            line += f"  {memory['retained_kb']:10.0f} KB retained, {memory['peak_kb']:10.0f} KB peak"
+        print(line, file=sys.stderr)
+    if not only or "statements" in only:
+        statements = results["statements"] = statement_microbenchmark(db, samples)
+        for kind in ("lookup", "link_insert"):
+            print(f"  {kind + ' (µs per call)':<40} baseline {statements[kind + '_baseline_us']:7.2f}, "
+                  f"reused cursor {statements[kind + '_reused_cursor_us']:7.2f}, "
+                  f"{STATEMENT_CACHE_SIZE} in flight: default cache {statements[kind + '_default_cache_us']:7.2f}, "
+                  f"sized {statements[kind + '_sized_cache_us']:7.2f}", file=sys.stderr)
+    db.close()
+    return results
+
+def compare_results(old: dict, new: dict, threshold: float):
+    # Print median ratios new/old & return the operations slower than threshold
+    regressions = []
+    for size, new_size in new["results"].items():
+        old_size = old["results"].get(size)
+        if not old_size:
+            continue
+        print(f"\n{size} songs: {'operation':<40} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+        for name, timing in new_size["operations"].items():
+            before = old_size["operations"].get(name)
+            if not before or before["median_ms"] == 0:
+                continue
+            ratio = timing["median_ms"] / before["median_ms"]
+            flag = " REGRESSION" if ratio > threshold else ""
+            print(f"{'':>{len(size) + 8}}{name:<40} {before['median_ms']:10.3f} "
+                  f"{timing['median_ms']:10.3f} {ratio:6.2f}x{flag}")
+            if flag:
+                regressions.append((size, name, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MusicDatabase operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Library sizes in songs (default: 10000 100000 1000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per operation")
+    parser.add_argument("--only", nargs="+", default=[], help="Run only these operations ('statements' for the statement microbenchmark)")
+    parser.add_argument("--workdir", default=None,
+                        help="Where to keep generated libraries (default: a temp folder)")
+    parser.add_argument("--reuse", action="store_true",
+                        help="Reuse libraries already generated in --workdir")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Slowdown ratio reported as a regression (default: 1.2)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="music_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    try:
+        for size in args.sizes:
+            print(f"{size} songs", file=sys.stderr)
+            output["results"][str(size)] = run_size(size, workdir, args.repeat, args.reuse, args.only)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare_results(json.load(f), output, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} operations regressed by more than {args.threshold}x")
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import threading
+from contextlib import contextmanager
+
+# ConnectionPool module - hands out SQLite connections to MusicDatabase
+# Every thread gets its own read connection, so report queries run in parallel
+# (WAL mode lets readers proceed while a write is in progress). All writes share
+# one writer connection & are serialized w/ a lock, since SQLite only allows a
+# single writer at a time anyway.
+class ConnectionPool:
+    def __init__(self, connect):
+        # connect() must open & configure a new connection
+        self._connect = connect
+        self._local = threading.local()
+        # Each reader by the thread it belongs to - readers of threads that
+        # have ended are closed the next time a reader is opened
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        # Thread inside the outermost writer() block (None when it's free) -
+        # its own lock, so another thread can read it while a write runs
+        self._writer_thread = None
+        self._writer_thread_lock = threading.Lock()
+        # Bumped as every outermost writer() block ends - caches of derived
+        # results compare it to tell whether a write may have changed them
+        self.write_generation = 0
+
+    def reader(self):
+        # This thread's read connection - opened the first time it's needed
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            with self._readers_lock:
+                self._close_dead_readers()
+                self._readers[threading.current_thread()] = connection
+        return connection
+
+    def _close_dead_readers(self):
+        # Close the readers of threads that exited w/o release_reader() -
+        # worker threads come & go, their connections shouldn't pile up
+        for thread in [thread for thread in self._readers if not thread.is_alive()]:
+            self._readers.pop(thread).close()
+
+    def release_reader(self):
+        # Close this thread's read connection now rather than once the thread
+        # has ended (see _close_dead_readers)
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            with self._readers_lock:
+                self._readers.pop(threading.current_thread(), None)
+            connection.close()
+
+    @contextmanager
+    def writer(self):
+        # Borrow the writer connection for one transaction
+        # Commits when the outermost block finishes, rolls back on any error
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            self._write_depth += 1
+            if self._write_depth == 1:
+                with self._writer_thread_lock:
+                    self._writer_thread = threading.get_ident()
+            try:
+                yield self._writer
+                if self._write_depth == 1 and self._writer.in_transaction:
+                    self._writer.commit()
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self.write_generation += 1
+                    with self._writer_thread_lock:
+                        self._writer_thread = None
+
+    def interrupt_writer(self, thread_id: int):
+        # Interrupt the writer's running statement if thread_id holds it - for
+        # cancelling a write from another thread. The interrupted statement
+        # raises in its writer() block, which rolls the transaction back.
+        with self._writer_thread_lock:
+            if self._writer_thread != thread_id:
+                return False
+            self._writer.interrupt()
+        return True
+
+    def connections(self):
+        # Every connection currently open - writer first, then the readers
+        with self._readers_lock:
+            self._close_dead_readers()
+            readers = list(self._readers.values())
+        return ([self._writer] if self._writer is not None else []) + readers
+
+    def close(self):
+        # Close the writer & every thread's reader
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for connection in self._readers.values():
+                connection.close()
+            self._readers = {}
+        self._local = threading.local()
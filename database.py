@@ -1,77 +1,525 @@
 import sqlite3
+import json
 import os
-from typing import List
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List
+from connection_pool import ConnectionPool
+from instrumentation import Instrumentation
+import maintenance
+
+# Connection profiles - PRAGMAs applied to every connection, in order
+#   durable             - WAL so readers don't block the writer, fsync every commit
+#   throughput          - WAL, fsync at checkpoints only, big cache & memory map
+#   read-only-analytics - opened read-only (mode=ro), biggest cache & memory map
+CONNECTION_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "temp_store": "DEFAULT",
+        "mmap_size": 0,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "mmap_size": 268435456,
+    },
+    "read-only-analytics": {
+        "query_only": "ON",
+        "cache_size": -256000,
+        "temp_store": "MEMORY",
+        "mmap_size": 1073741824,
+    },
+}
+
+# Profiles whose connections are opened w/ a read-only URI
+READ_ONLY_PROFILES = {"read-only-analytics"}
+
+# PRAGMAs reported by MusicDatabase.get_active_pragmas
+INSPECTED_PRAGMAS = ["journal_mode", "synchronous", "cache_size", "temp_store",
+                     "mmap_size", "query_only", "foreign_keys"]
+
+# Query registry - every fixed SQL statement MusicDatabase runs, by name
+# sqlite3 keeps each connection's compiled statements in an LRU keyed by the
+# SQL text, so one shared string per query means one compiled copy, reused
+# on every call. Statements built per table or kind (bulk, prefix pages,
+# cubes, orphans & bulk import) are counted in DYNAMIC_STATEMENTS, at the
+# end of this module.
+QUERIES = {
+    # Artists
+    "artist.insert": "INSERT INTO Artist (Name) VALUES (?)",
+    "artist.all": "SELECT * FROM Artist ORDER BY Name",
+    "artist.by_name": "SELECT * FROM Artist WHERE Name = ?",
+    "artist.rename": "UPDATE Artist SET Name = ? WHERE Name = ?",
+    "artist.delete": "DELETE FROM Artist WHERE Name = ?",
+    "artist.existing": "SELECT ArtistID FROM Artist WHERE ArtistID IN (SELECT value FROM json_each(?))",
+
+    # Categories
+    "category.insert": "INSERT INTO Category (CategoryName) VALUES (?)",
+    "category.all": "SELECT * FROM Category ORDER BY CategoryName",
+    "category.by_name": "SELECT * FROM Category WHERE CategoryName = ?",
+    "category.rename": "UPDATE Category SET CategoryName = ? WHERE CategoryName = ?",
+    "category.delete": "DELETE FROM Category WHERE CategoryName = ?",
+    "category.existing": "SELECT CategoryID FROM Category WHERE CategoryID IN (SELECT value FROM json_each(?))",
+
+    # Albums - titles aren't unique, so by-title lookups stop at the first row
+    "album.insert": "INSERT INTO Album (Title, Year) VALUES (?, ?)",
+    "album.all": "SELECT * FROM Album ORDER BY Title",
+    "album.years": "SELECT DISTINCT Year FROM Album ORDER BY Year",
+    "album.by_name": "SELECT * FROM Album WHERE Title = ? LIMIT 1",
+    "album.rename": "UPDATE Album SET Title = ?, Year = ? WHERE Title = ?",
+    "album.delete": "DELETE FROM Album WHERE Title = ?",
+    "album.existing": "SELECT AlbumID FROM Album WHERE AlbumID IN (SELECT value FROM json_each(?))",
+
+    # Songs
+    "song.insert": "INSERT INTO Song (Title) VALUES (?)",
+    "song.all": """
+        SELECT SongID, Title, Artists, Albums, Categories
+        FROM SongSummary
+        ORDER BY Title, SongID
+    """,
+    "song.page": """
+        SELECT SongID, Title, Artists, Albums, Categories
+        FROM SongSummary
+        WHERE (Title, SongID) > (?, ?)
+        ORDER BY Title, SongID
+        LIMIT ?
+    """,
+    "song.by_name": "SELECT * FROM Song WHERE Title = ? LIMIT 1",
+    "song.rename": "UPDATE Song SET Title = ? WHERE Title = ?",
+    "song.delete": "DELETE FROM Song WHERE Title = ?",
+    "song.artists": """
+        SELECT a.ArtistID, a.Name
+        FROM Artist a
+        JOIN Plays p ON a.ArtistID = p.ArtistID
+        WHERE p.SongID = ?
+        ORDER BY a.Name
+    """,
+    "song.categories": """
+        SELECT c.CategoryID, c.CategoryName
+        FROM Category c
+        JOIN IsIn i ON c.CategoryID = i.CategoryID
+        WHERE i.SongID = ?
+        ORDER BY c.CategoryName
+    """,
+    "song.albums": """
+        SELECT a.AlbumID, a.Title, a.Year
+        FROM Album a
+        JOIN IsOn i ON a.AlbumID = i.AlbumID
+        WHERE i.SongID = ?
+        ORDER BY a.Title
+    """,
+
+    # Song links - every insert takes (SongID, linked ID)
+    "plays.insert": "INSERT OR IGNORE INTO Plays (SongID, ArtistID) VALUES (?, ?)",
+    "plays.delete": "DELETE FROM Plays WHERE SongID = ? AND ArtistID = ?",
+    "ison.insert": "INSERT OR IGNORE INTO IsOn (SongID, AlbumID) VALUES (?, ?)",
+    "ison.delete": "DELETE FROM IsOn WHERE SongID = ? AND AlbumID = ?",
+    "isin.insert": "INSERT OR IGNORE INTO IsIn (SongID, CategoryID) VALUES (?, ?)",
+    "isin.delete": "DELETE FROM IsIn WHERE SongID = ? AND CategoryID = ?",
+
+    # Song summary
+    "summary.clear": "DELETE FROM SongSummary",
+    "summary.rebuild": """
+        INSERT INTO SongSummary (Title, SongID, Artists, Albums, Categories)
+        SELECT Title, SongID, Artists, Albums, Categories FROM SongSummaryLive
+    """,
+    "summary.verify": """
+        SELECT SongID FROM (
+            SELECT Title, SongID, Artists, Albums, Categories FROM SongSummaryLive
+            EXCEPT
+            SELECT Title, SongID, Artists, Albums, Categories FROM SongSummary
+        )
+        UNION
+        SELECT SongID FROM (
+            SELECT Title, SongID, Artists, Albums, Categories FROM SongSummary
+            EXCEPT
+            SELECT Title, SongID, Artists, Albums, Categories FROM SongSummaryLive
+        )
+        ORDER BY SongID
+    """,
+
+    # Bulk delete & rename scratch tables (temp schema, writer only)
+    "bulk.create_names": """
+        CREATE TEMP TABLE IF NOT EXISTS BulkNames (
+            Name TEXT PRIMARY KEY, NewName TEXT, Outcome TEXT)
+    """,
+    "bulk.create_names_index": "CREATE INDEX IF NOT EXISTS temp.idx_bulknames_new ON BulkNames(NewName)",
+    "bulk.create_ids": "CREATE TEMP TABLE IF NOT EXISTS BulkIDs (ID INTEGER PRIMARY KEY, Name TEXT)",
+    "bulk.clear_names": "DELETE FROM temp.BulkNames",
+    "bulk.clear_ids": "DELETE FROM temp.BulkIDs",
+    "bulk.add_name": "INSERT OR IGNORE INTO temp.BulkNames (Name) VALUES (?)",
+    "bulk.add_rename": "INSERT INTO temp.BulkNames (Name, NewName) VALUES (?, ?)",
+    "bulk.deleted": "SELECT Name, COUNT(*) FROM temp.BulkIDs GROUP BY Name",
+    "bulk.outcomes": "SELECT Name, Outcome FROM temp.BulkNames",
+
+    # Reports
+    "report.songs_by_artist": """
+        SELECT s.Title AS Title, a.Name AS ArtistName
+        FROM Song s
+        JOIN Plays p ON s.SongID = p.SongID
+        JOIN Artist a ON p.ArtistID = a.ArtistID
+        WHERE a.Name = ?
+        ORDER BY a.Name
+    """,
+    "discography.songs": """
+        SELECT al.AlbumID, al.Title, al.Year, s.SongID, s.Title
+        FROM Plays p
+        JOIN Song s ON s.SongID = p.SongID
+        LEFT JOIN IsOn io ON io.SongID = s.SongID
+        LEFT JOIN Album al ON al.AlbumID = io.AlbumID
+        WHERE p.ArtistID = ?
+        ORDER BY al.AlbumID IS NULL, al.Year, al.Title, al.AlbumID, s.Title, s.SongID
+    """,
+    "discography.categories": """
+        SELECT ii.SongID, c.CategoryName
+        FROM Plays p
+        JOIN IsIn ii ON ii.SongID = p.SongID
+        JOIN Category c ON c.CategoryID = ii.CategoryID
+        WHERE p.ArtistID = ?
+        ORDER BY c.CategoryName
+    """,
+    "cube.is_dirty": "SELECT 1 FROM CubeDirty WHERE Kind = ? AND Key = ?",
+    "cube.clean": "DELETE FROM CubeDirty WHERE Kind = ? AND Key = ?",
+    "cube.dirty": "SELECT Kind, Key FROM CubeDirty",
+    "cube.dirty_count": "SELECT COUNT(*) FROM CubeDirty WHERE Kind = ?",
+    "cube.clean_all": "DELETE FROM CubeDirty",
+
+    # Full-text search
+    "search.match": """
+        SELECT CASE id % 4
+                   WHEN 0 THEN 'Artist'
+                   WHEN 1 THEN 'Category'
+                   WHEN 2 THEN 'Album'
+                   ELSE 'Song'
+               END AS Kind,
+               id / 4 AS ID,
+               Name
+        FROM (
+            SELECT rowid AS id, Name, rank
+            FROM LibrarySearch
+            WHERE LibrarySearch MATCH ?
+            LIMIT ?
+        )
+        ORDER BY rank
+        LIMIT ?
+    """,
+    "search.name": """
+        WITH Names(Name) AS (SELECT value FROM json_each(?))
+        SELECT 'Artist' AS Kind, ArtistID AS ID, Name FROM Artist
+        WHERE Name IN (SELECT Name FROM Names)
+        UNION ALL
+        SELECT 'Category', CategoryID, CategoryName FROM Category
+        WHERE CategoryName IN (SELECT Name FROM Names)
+        UNION ALL
+        SELECT 'Album', AlbumID, Title FROM Album
+        WHERE Title IN (SELECT Name FROM Names)
+        UNION ALL
+        SELECT 'Song', SongID, Title FROM Song
+        WHERE Title IN (SELECT Name FROM Names)
+        LIMIT ?
+    """,
+    "search.name_candidates": """
+        SELECT CASE rowid % 4
+                   WHEN 0 THEN 'Artist'
+                   WHEN 1 THEN 'Category'
+                   WHEN 2 THEN 'Album'
+                   ELSE 'Song'
+               END AS Kind,
+               rowid / 4 AS ID,
+               Name
+        FROM LibrarySearch
+        WHERE LibrarySearch MATCH ?
+        LIMIT ?
+    """,
+    "search.terms": """
+        SELECT term, doc FROM LibrarySearchTerms
+        WHERE term >= ? AND term < ? AND length(term) BETWEEN ? AND ?
+    """,
+    "search.clear": "DELETE FROM LibrarySearch",
+    "search.add_artists": "INSERT INTO LibrarySearch (rowid, Name) SELECT ArtistID * 4, Name FROM Artist",
+    "search.add_categories": "INSERT INTO LibrarySearch (rowid, Name) SELECT CategoryID * 4 + 1, CategoryName FROM Category",
+    "search.add_albums": "INSERT INTO LibrarySearch (rowid, Name) SELECT AlbumID * 4 + 2, Title FROM Album",
+    "search.add_songs": "INSERT INTO LibrarySearch (rowid, Name) SELECT SongID * 4 + 3, Title FROM Song",
+}
+
+# Oldest SQLite the queries & migrations run on - UPDATE ... FROM (bulk
+# renames) needs 3.33, PRAGMA analysis_limit 3.32
+MIN_SQLITE_VERSION = (3, 33, 0)
+
+# Optional SQLite features the library can't do without, as a statement that
+# fails on builds compiled w/o them - FTS5 (& fts5vocab) for search, JSON1
+# for json_each
+REQUIRED_SQLITE_FEATURES = {
+    "FTS5": "CREATE VIRTUAL TABLE temp.Probe USING fts5(Name)",
+    "JSON1": "SELECT value FROM json_each('[1]')",
+}
+
+def check_sqlite():
+    # Fail clearly up front rather than w/ a syntax error mid-session when
+    # Python is linked against an older or trimmed-down SQLite
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required "
+                           f"(this Python uses {sqlite3.sqlite_version})")
+    connection = sqlite3.connect(":memory:")
+    try:
+        for feature, probe in REQUIRED_SQLITE_FEATURES.items():
+            try:
+                connection.execute(probe)
+            except sqlite3.OperationalError:
+                raise RuntimeError(f"SQLite {sqlite3.sqlite_version} was built without {feature}, "
+                                   f"which this library needs") from None
+    finally:
+        connection.close()
 
 # MusicDatabase module - provides CRUD & Report methods for all entities in
 # the database - designed to be imported into a manager/orchestrator
 class MusicDatabase:
-    def __init__(self, db_name: str = "music.db"):
+    def __init__(self, db_name: str = "music.db", profile: str = "durable",
+                 cache_size: int = 10000, discography_cache_size: int = 256):
+        if profile not in CONNECTION_PROFILES:
+            raise ValueError(f"Unknown connection profile: {profile} "
+                             f"(choose from {', '.join(CONNECTION_PROFILES)})")
         # Always store the DB in the same folder as this file
         # Prevents any issues running application with VsCode shortcuts
         self.db_name = os.path.join(os.path.dirname(os.path.abspath(__file__)), db_name)
-        self.connection = None
+        self.profile = profile
+        self.read_only = profile in READ_ONLY_PROFILES
+        self.pool = None
+        # Functions called w/ every new connection (e.g. to install tracing)
+        self.connection_hooks = []
+        self.instrumentation = None
+        # Run PRAGMA optimize on every connection as it's closed
+        self.optimize_on_close = True
+        # Read-through name lookup caches - writes made through this instance
+        # invalidate exactly the names they touch
+        self.name_cache = {
+            "artist": LRUCache(cache_size),
+            "category": LRUCache(cache_size),
+            "album": LRUCache(cache_size),
+        }
+        # Artist discographies by name, each stored w/ the pool's
+        # write_generation - any write through this instance retires them all
+        self.discography_cache = LRUCache(discography_cache_size)
 
     # ===== DB Initialization & Connection Methods ======
 
     def connect(self):
         # Create new or access existing database
-        self.connection = sqlite3.connect(self.db_name)
-        self.connection.row_factory = sqlite3.Row
+        # Connections are opened on demand by the pool - one reader per thread
+        # & a single shared writer - so the instance can serve many threads
+        check_sqlite()
+        self.pool = ConnectionPool(self.open_connection)
         return self.connection
+
+    def open_connection(self):
+        # Open one connection configured w/ the selected profile
+        # check_same_thread is off so the pool can close every thread's reader
+        # & the statement cache holds every registry query (see QUERIES)
+        if self.read_only:
+            connection = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True,
+                                         check_same_thread=False,
+                                         cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            connection = sqlite3.connect(self.db_name, check_same_thread=False,
+                                         cached_statements=STATEMENT_CACHE_SIZE)
+        connection.row_factory = sqlite3.Row
+        # New files start in auto_vacuum=INCREMENTAL - it can only be switched
+        # w/o a VACUUM while the file is still empty (before journal_mode=WAL
+        # writes its first page). Existing files are left to set_auto_vacuum.
+        if not self.read_only and connection.execute("PRAGMA page_count").fetchone()[0] == 0:
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.apply_profile(connection)
+        # Enforce the schema's REFERENCES clauses - deleting a song, artist,
+        # album or category cascades to its Plays/IsOn/IsIn rows. Every
+        # junction column leads an index, so each cascade is an index lookup
+        connection.execute("PRAGMA foreign_keys = ON")
+        for hook in self.connection_hooks:
+            hook(connection)
+        return connection
+
+    @property
+    def connection(self):
+        # The calling thread's read connection
+        return self.pool.reader() if self.pool else None
+
+    def apply_profile(self, connection: sqlite3.Connection):
+        # Set the PRAGMAs of the selected connection profile
+        for pragma, value in CONNECTION_PROFILES[self.profile].items():
+            connection.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+    def get_active_pragmas(self):
+        # Report the PRAGMA values the connection is actually running with
+        pragmas = {"profile": self.profile}
+        for pragma in INSPECTED_PRAGMAS:
+            pragmas[pragma] = self.pool.reader().execute(f"PRAGMA {pragma}").fetchone()[0]
+        return pragmas
     
     def close(self):
-        # Close database connection
-        if self.connection:
-            self.connection.close()
+        # Close every database connection - after a PRAGMA optimize, so tables
+        # whose statistics went stale while this instance ran get re-analyzed
+        if self.pool:
+            if self.optimize_on_close:
+                maintenance.optimize(self, self.pool.connections())
+            self.pool.close()
+
+    # Row formats the listing & report methods can return: "row" (sqlite3.Row)
+    # or "tuple" (plain tuples - less memory & faster to build)
+    ROW_FORMATS = ("row", "tuple")
+
+    def _reader_cursor(self, row_format: str = "row"):
+        # A cursor on this thread's reader that builds rows in row_format
+        if row_format not in self.ROW_FORMATS:
+            raise ValueError(f"Unknown row format '{row_format}' (expected one of {', '.join(self.ROW_FORMATS)})")
+        cursor = self.pool.reader().cursor()
+        if row_format == "tuple":
+            cursor.row_factory = None
+        return cursor
+
+    # ============= Instrumentation Methods ===============
+
+    def enable_instrumentation(self, slow_query_ms: float = 100.0):
+        # Start timing every method - calls slower than slow_query_ms are logged
+        # w/ their SQL & query plans (see instrumentation.py)
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self, slow_query_ms)
+            self.instrumentation.attach()
+        self.instrumentation.slow_query_ms = slow_query_ms
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        # Stop timing & drop the collected stats
+        if self.instrumentation is not None:
+            self.instrumentation.detach()
+            self.instrumentation = None
+
+    def get_stats(self):
+        # Latency histograms, row counts & the slow query log (None when off)
+        if self.instrumentation is None:
+            return None
+        return self.instrumentation.stats()
+
+    def reset_stats(self):
+        if self.instrumentation is not None:
+            self.instrumentation.reset()
+
+    # ================ Maintenance Methods ===================
+    # See maintenance.py
+
+    def get_page_report(self):
+        # Page usage, free pages & per table/index fragmentation
+        return maintenance.page_report(self)
+
+    def analyze(self, table: str = None, limit: int = None):
+        # Gather planner statistics now - returns the seconds taken
+        return maintenance.analyze(self, table, limit)
+
+    def optimize(self):
+        # PRAGMA optimize on the writer (close() runs it on every connection)
+        return maintenance.optimize(self)
+
+    def set_auto_vacuum(self, mode: str = "INCREMENTAL"):
+        # Switch auto_vacuum mode - rebuilds the file w/ VACUUM
+        return maintenance.set_auto_vacuum(self, mode)
+
+    def incremental_vacuum(self, pages: int = None):
+        # Return free pages to the filesystem - returns the number freed
+        return maintenance.incremental_vacuum(self, pages)
+
+    def vacuum(self):
+        # Rebuild the whole file - returns its size before & after
+        return maintenance.vacuum(self)
+
+    def run_maintenance(self, vacuum_threshold: float = maintenance.VACUUM_THRESHOLD):
+        # Scheduled maintenance pass - optimize, then vacuum if enough is free
+        return maintenance.run_maintenance(self, vacuum_threshold)
 
     def initialize_database(self, schema_file: str = "schema.sql"):
-        # Use schema.sql file to create db tables if not existent
-        try:
-            with open(schema_file, 'r') as f:
-                schema = f.read()
-            cursor = self.connection.cursor()
-            cursor.executescript(schema)
-            self.connection.commit()
-            print("Database Initialized")
-        except FileNotFoundError:
-            print(f"Error: {schema_file} not found")
-        except Exception as e:
-            print(f"Error initializing: {e}")
+        # Bring the database schema up to date
+        # schema.sql is version 1 & each migrations/NNN_*.sql file is version NNN
+        # PRAGMA user_version records the last version applied, so only the
+        # pending steps run - a new database runs all of them
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        steps = [(1, os.path.join(base_dir, schema_file))] + self.get_migrations()
+        current = self.get_schema_version()
+        # Libraries created before user_version was tracked are at version 0
+        # too - only a file w/o any tables is actually new (& has no data
+        # for ANALYZE to gather statistics on)
+        new_file = self.pool.reader().execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table')").fetchone()[0]
+        # Returns the versions applied & prints nothing - the caller reports
+        # them (or the error a failed step raises) wherever its output goes
+        applied = []
+        for version, path in steps:
+            if version <= current:
+                continue
+            with open(path, 'r') as f:
+                sql = f.read()
+            # Each step & its version bump are committed together or not at all
+            with self.pool.writer() as connection:
+                connection.executescript(
+                    f"BEGIN;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;")
+            applied.append(version)
+
+        if applied and not new_file:
+            # Give the planner statistics for any tables & indexes just added
+            maintenance.analyze(self, limit=maintenance.ANALYSIS_LIMIT)
+        return applied
+
+    def get_migrations(self):
+        # List (version, path) for every file in the migrations folder
+        migrations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+        migrations = []
+        for file_name in os.listdir(migrations_dir):
+            prefix = file_name.split("_", 1)[0]
+            if file_name.endswith(".sql") and prefix.isdigit():
+                migrations.append((int(prefix), os.path.join(migrations_dir, file_name)))
+        return sorted(migrations)
+
+    def get_schema_version(self):
+        # Last migration applied to this database (0 for a brand new file)
+        return self.pool.reader().execute("PRAGMA user_version").fetchone()[0]
 
     # ==================== Artist Methods ======================
 
     def create_artist(self, name: str):
         # Create a new entry in the Artist table
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO Artist (Name) VALUES (?)", (name,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["artist.insert"], (name,))
+        self.name_cache["artist"].invalidate(name)
         return cursor.lastrowid
     
-    def get_all_artists(self):
+    def get_all_artists(self, row_format: str = "row"):
         # Retrieve all artist entries
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Artist ORDER BY Name")
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["artist.all"])
         return cursor.fetchall()
     
     def get_artist_by_name(self, name: str):
         # Retrieve an artist entry by name
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Artist WHERE Name = ?", (name,))
-        return cursor.fetchone()
+        return self._cached_lookup("artist", name)
     
     def update_artist_by_name(self, old_name: str, new_name: str):
         # Update an artist entry
-        cursor = self.connection.cursor()
-        cursor.execute("UPDATE Artist SET Name = ? WHERE Name = ?", (new_name, old_name))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["artist.rename"], (new_name, old_name))
+        self.name_cache["artist"].invalidate(old_name, new_name)
         # Return true if a row was modified
         return cursor.rowcount > 0
     
     def delete_artist_by_name(self, name: str):
         # Delete an artist by name
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM Artist WHERE Name = ?", (name,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["artist.delete"], (name,))
+        self.name_cache["artist"].invalidate(name)
         # Return true if a row was deleted
         return cursor.rowcount > 0
     
@@ -79,244 +527,1220 @@ class MusicDatabase:
 
     def create_category(self, name: str):
         # Create a new entry in the category table
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO Category (CategoryName) VALUES (?)", (name,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["category.insert"], (name,))
+        self.name_cache["category"].invalidate(name)
         return cursor.lastrowid
     
-    def get_all_categories(self):
+    def get_all_categories(self, row_format: str = "row"):
         # Retrieve all categories
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Category ORDER BY CategoryName")
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["category.all"])
         return cursor.fetchall()
     
     def get_category_by_name(self, name: str):
         # Retrieve a category by name
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Category WHERE CategoryName = ?", (name,))
-        return cursor.fetchone
+        return self._cached_lookup("category", name)
     
     def update_category_by_name(self, old_name: str, new_name: str):
         # Update a category by name
-        cursor = self.connection.cursor()
-        cursor.execute("UPDATE Category SET CategoryName = ? WHERE CategoryName = ?", (new_name, old_name))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["category.rename"], (new_name, old_name))
+        self.name_cache["category"].invalidate(old_name, new_name)
         return cursor.rowcount > 0
     
     def delete_category_by_name(self, name: str):
         # Delete a category by name
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM Category WHERE CategoryName = ?", (name,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["category.delete"], (name,))
+        self.name_cache["category"].invalidate(name)
         return cursor.rowcount > 0
     
     # =================== Album Methods =========================
 
     def create_album(self, title:str, year:int):
         # Create new entry in album table
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO Album (Title, Year) VALUES (?, ?)", (title, year))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["album.insert"], (title, year))
+        self.name_cache["album"].invalidate(title)
         return cursor.lastrowid
     
-    def get_all_albums(self):
+    def get_all_albums(self, row_format: str = "row"):
         # Retrieve all albums
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Album ORDER BY Title")
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["album.all"])
         return cursor.fetchall()
-    
+
+    def get_album_years(self):
+        # Retrieve every year that has an album, oldest first
+        cursor = self._reader_cursor("tuple")
+        cursor.execute(QUERIES["album.years"])
+        return [year for (year,) in cursor.fetchall()]
+
     def get_album_by_name(self, title: str):
         # Retrieve album by name
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Album WHERE Title = ?", (title,))
-        return cursor.fetchone()
+        return self._cached_lookup("album", title)
     
     def update_album_by_name(self, old_title: str, new_title: str, year: int):
         # Update an album by title
-        cursor = self.connection.cursor()
-        cursor.execute("UPDATE Album SET Title = ?, Year = ? WHERE Title = ?", (new_title, year, old_title))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["album.rename"], (new_title, year, old_title))
+        self.name_cache["album"].invalidate(old_title, new_title)
         return cursor.rowcount > 0
     
     def delete_album_by_name(self, title: str):
         # Delete an album by title
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM Album WHERE Title = ?", (title,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["album.delete"], (title,))
+        self.name_cache["album"].invalidate(title)
         return cursor.rowcount > 0
 
+    # =============== Name Lookup Cache Methods ===================
+
+    def _cached_lookup(self, kind: str, name: str):
+        # Serve a by-name lookup from the cache, querying only on a miss
+        # Misses are cached too (as None) - create_* invalidates them
+        cache = self.name_cache[kind]
+        row = cache.get(name, _MISSING)
+        if row is _MISSING:
+            # Read the generation first so a write that lands mid-query
+            # stops this (possibly stale) row from being cached
+            generation = cache.generation
+            cursor = self.pool.reader().cursor()
+            row = cursor.execute(QUERIES[f"{kind}.by_name"], (name,)).fetchone()
+            cache.put(name, row, generation)
+        return row
+
+    def get_cache_stats(self):
+        # Hit/miss/eviction counters for each name lookup cache & the
+        # discography cache
+        stats = {kind: cache.stats() for kind, cache in self.name_cache.items()}
+        stats["discography"] = self.discography_cache.stats()
+        return stats
+
+    def clear_name_cache(self):
+        # Drop every cached lookup & discography - e.g. after another process
+        # edited the db
+        for cache in self.name_cache.values():
+            cache.clear()
+        self.discography_cache.clear()
+
+    # ================ Prefix Search Methods ======================
+
+    def find_artists(self, prefix: str = "", after: tuple = None, limit: int = 20):
+        # One page of artists whose name starts w/ prefix (case-sensitive)
+        return self._prefix_page("Artist", "ArtistID", "Name", "ArtistID, Name", prefix, after, limit)
+
+    def find_categories(self, prefix: str = "", after: tuple = None, limit: int = 20):
+        # One page of categories whose name starts w/ prefix (case-sensitive)
+        return self._prefix_page("Category", "CategoryID", "CategoryName", "CategoryID, CategoryName",
+                                 prefix, after, limit)
+
+    def find_albums(self, prefix: str = "", after: tuple = None, limit: int = 20):
+        # One page of albums whose title starts w/ prefix (case-sensitive)
+        return self._prefix_page("Album", "AlbumID", "Title", "AlbumID, Title, Year", prefix, after, limit)
+
+    def _prefix_page(self, table: str, id_column: str, name_column: str, columns: str,
+                     prefix: str, after: tuple, limit: int):
+        # Prefix match as a range on the name index: name >= prefix AND
+        # name < prefix w/ its last character bumped, so only the matching
+        # rows are read. Pages are keyset paginated like get_songs_page -
+        # after is the (name, ID) of the last row on the previous page.
+        if after is None:
+            after = (prefix, 0)
+        conditions = [f"({name_column}, {id_column}) > (?, ?)"]
+        params = [after[0], after[1]]
+        upper = _prefix_upper_bound(prefix)
+        if upper is not None:
+            conditions.append(f"{name_column} < ?")
+            params.append(upper)
+        cursor = self.pool.reader().cursor()
+        cursor.execute(f"""
+            SELECT {columns} FROM {table}
+            WHERE {name_column} >= ? AND {' AND '.join(conditions)}
+            ORDER BY {name_column}, {id_column}
+            LIMIT ?
+        """, [prefix] + params + [limit])
+        return cursor.fetchall()
+
     # ================ Song Methods =========================
 
     def create_song(self, title: str):
         # Create new entry in song table
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO Song (Title) VALUES (?)", (title,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["song.insert"], (title,))
         return cursor.lastrowid
+
+    def create_song_with_links(self, title: str, artist_ids: Iterable[int] = (),
+                               album_ids: Iterable[int] = (), category_ids: Iterable[int] = ()):
+        # Create a song & link it to its artists, albums & categories in one
+        # transaction - if any ID doesn't exist nothing is written
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["song.insert"], (title,))
+            song_id = cursor.lastrowid
+            self.add_links_to_song(song_id, artist_ids, album_ids, category_ids)
+        return song_id
     
-    def get_all_songs(self):
-        # Retrieve all songs - join all tables for pulling related song data
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT DISTINCT s.SongID, s.Title,
-                   GROUP_CONCAT(DISTINCT a.Name) as Artists,
-                   GROUP_CONCAT(DISTINCT al.Title) as Albums,
-                   GROUP_CONCAT(DISTINCT c.CategoryName) as Categories
-            FROM Song s
-            LEFT JOIN Plays p ON s.SongID = p.SongID
-            LEFT JOIN Artist a ON p.ArtistID = a.ArtistID
-            LEFT JOIN IsOn io ON s.SongID = io.SongID
-            LEFT JOIN Album al ON io.AlbumID = al.AlbumID
-            LEFT JOIN IsIn ii ON s.SongID = ii.SongID
-            LEFT JOIN Category c ON ii.CategoryID = c.CategoryID
-            GROUP BY s.SongID
-            ORDER BY s.Title
-        """)
+    def get_all_songs(self, row_format: str = "row"):
+        # Retrieve all songs w/ their artists, albums & categories
+        # SongSummary is kept up to date by triggers, so this is a single scan
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["song.all"])
         return cursor.fetchall()
     
+    def get_songs_page(self, after: tuple = None, limit: int = 50, row_format: str = "row"):
+        # Retrieve one page of songs in (Title, SongID) order - keyset pagination
+        # after is the (Title, SongID) of the last song on the previous page,
+        # so each page is an index seek rather than an OFFSET scan
+        cursor = self._reader_cursor(row_format)
+        if after is None:
+            after = ("", 0)
+        cursor.execute(QUERIES["song.page"], (after[0], after[1], limit))
+        return cursor.fetchall()
+
+    def iter_songs(self, page_size: int = 500, row_format: str = "row"):
+        # Yield every song page by page - memory stays at one page
+        after = None
+        while True:
+            page = self.get_songs_page(after, page_size, row_format)
+            yield from page
+            if len(page) < page_size:
+                break
+            # (Title, SongID) by position, so every row format works
+            after = (page[-1][1], page[-1][0])
+
     def get_song_by_name(self, title: str):
         # Retrieve a song by name
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM Song WHERE Title = ?", (title,))
+        cursor = self.pool.reader().cursor()
+        cursor.execute(QUERIES["song.by_name"], (title,))
         return cursor.fetchone()
     
     def update_song_by_name(self, old_title: str, new_title: str):
         # Update a song by name
-        cursor = self.connection.cursor()
-        cursor.execute("UPDATE Song SET Title = ? WHERE Title = ?", (new_title, old_title))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["song.rename"], (new_title, old_title))
         return cursor.rowcount > 0
     
     def delete_song_by_name(self, title: str):
         # Delete a song by name
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM Song WHERE Title = ?", (title,))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["song.delete"], (title,))
         return cursor.rowcount > 0
-    
+
+    # =============== Bulk Delete & Rename Methods =================
+
+    # Tables the bulk methods work on - kind: (table, ID column, name column)
+    BULK_TABLES = {
+        "artist": ("Artist", "ArtistID", "Name"),
+        "category": ("Category", "CategoryID", "CategoryName"),
+        "album": ("Album", "AlbumID", "Title"),
+        "song": ("Song", "SongID", "Title"),
+    }
+    # Kinds whose names are UNIQUE - a rename onto a name in use is refused
+    UNIQUE_NAME_KINDS = {"artist", "category"}
+
+    def delete_many(self, kind: str, names: Iterable[str] = None, where: str = None,
+                    params: tuple = ()):
+        # Delete every artist/category/album/song named in names - or matching
+        # the SQL predicate where, e.g. where="Title LIKE ?", params=("Live - %",)
+        # - w/ their links, all in one transaction
+        # Returns {name: rows deleted} (0 for a name that wasn't found)
+        table, id_column, name_column = self._bulk_table(kind)
+        if (names is None) == (where is None):
+            raise ValueError("Pass either names or where")
+        if names is not None:
+            names = list(dict.fromkeys(names))
+
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            self._clear_bulk_tables(cursor)
+            # Collect the IDs to delete w/ one join against the names
+            if names is not None:
+                cursor.executemany(QUERIES["bulk.add_name"], ((name,) for name in names))
+                cursor.execute(f"""
+                    INSERT INTO temp.BulkIDs (ID, Name)
+                    SELECT t.{id_column}, t.{name_column}
+                    FROM temp.BulkNames b JOIN {table} t ON t.{name_column} = b.Name
+                """)
+            else:
+                cursor.execute(f"""
+                    INSERT INTO temp.BulkIDs (ID, Name)
+                    SELECT {id_column}, {name_column} FROM {table} WHERE {where}
+                """, params)
+
+            # Songs cascade to their links - the SongSummary triggers on those
+            # find no summary row left to update. Other rows have their links
+            # removed set-based first, one statement per link table: cascading
+            # from them would recompute each affected song's summary twice
+            # (once per link & again in the row's own delete trigger)
+            if kind != "song":
+                for link_table, link_column in self._bulk_links(kind):
+                    cursor.execute(f"DELETE FROM {link_table} WHERE {link_column} IN (SELECT ID FROM temp.BulkIDs)")
+            cursor.execute(f"DELETE FROM {table} WHERE {id_column} IN (SELECT ID FROM temp.BulkIDs)")
+
+            cursor.execute(QUERIES["bulk.deleted"])
+            deleted = {name: count for name, count in cursor.fetchall()}
+            self._clear_bulk_tables(cursor)
+
+        self._invalidate_bulk_names(kind, deleted)
+        if names is not None:
+            return {name: deleted.get(name, 0) for name in names}
+        return deleted
+
+    def rename_many(self, kind: str, renames):
+        # Rename artists/categories/albums/songs in one transaction - renames is
+        # a dict or (old, new) pairs (the last pair for a name wins). Albums
+        # keep their year & every song/album sharing a title is renamed.
+        # Returns {old: outcome} - "renamed", "missing" (no such name),
+        # "unchanged" (old == new) or, for artists & categories, "conflict"
+        # (the new name is already taken, or given for more than one rename)
+        table, id_column, name_column = self._bulk_table(kind)
+        renames = dict(renames)
+
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            self._clear_bulk_tables(cursor)
+            cursor.executemany(QUERIES["bulk.add_rename"], renames.items())
+            conflict = "0"
+            if kind in self.UNIQUE_NAME_KINDS:
+                conflict = f"""
+                    EXISTS (SELECT 1 FROM {table} t WHERE t.{name_column} = b.NewName)
+                    OR (SELECT COUNT(*) FROM temp.BulkNames d WHERE d.NewName = b.NewName
+                        AND EXISTS (SELECT 1 FROM {table} t WHERE t.{name_column} = d.Name)) > 1
+                """
+            cursor.execute(f"""
+                UPDATE temp.BulkNames AS b SET Outcome = CASE
+                    WHEN NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{name_column} = b.Name) THEN 'missing'
+                    WHEN b.Name = b.NewName THEN 'unchanged'
+                    WHEN {conflict} THEN 'conflict'
+                    ELSE 'renamed' END
+            """)
+            cursor.execute(f"""
+                UPDATE {table} SET {name_column} = b.NewName
+                FROM temp.BulkNames b
+                WHERE b.Name = {table}.{name_column} AND b.Outcome = 'renamed'
+            """)
+            cursor.execute(QUERIES["bulk.outcomes"])
+            outcomes = {name: outcome for name, outcome in cursor.fetchall()}
+            self._clear_bulk_tables(cursor)
+
+        self._invalidate_bulk_names(kind, list(renames) + list(renames.values()))
+        return {old: outcomes[old] for old in renames}
+
+    def _bulk_table(self, kind: str):
+        if kind not in self.BULK_TABLES:
+            raise ValueError(f"Unknown kind '{kind}' (expected one of {', '.join(self.BULK_TABLES)})")
+        return self.BULK_TABLES[kind]
+
+    def _bulk_links(self, kind: str):
+        # (junction table, column) pairs that point at artists, albums or categories
+        table = self.BULK_TABLES[kind][0]
+        return [(link_table, column) for link_table, link_target, column in self.SONG_LINKS
+                if link_target == table]
+
+    def _clear_bulk_tables(self, cursor: sqlite3.Cursor):
+        # Empty the writer's scratch tables, creating them on first use
+        # They live in the temp schema - private to the writer connection
+        for name in ("bulk.create_names", "bulk.create_names_index", "bulk.create_ids",
+                     "bulk.clear_names", "bulk.clear_ids"):
+            cursor.execute(QUERIES[name])
+
+    def _invalidate_bulk_names(self, kind: str, names: Iterable[str]):
+        # Drop the touched names from the lookup cache - songs aren't cached
+        if kind in self.name_cache:
+            self.name_cache[kind].invalidate(*names)
+
+    # ============ Song Summary Maintenance Methods ==============
+
+    def rebuild_song_summary(self):
+        # Recompute every SongSummary row from the live tables
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["summary.clear"])
+            cursor.execute(QUERIES["summary.rebuild"])
+        return cursor.rowcount
+
+    def verify_song_summary(self):
+        # Compare SongSummary against the live join - returns the IDs of songs
+        # whose summary is missing, extra or out of date (empty when in sync)
+        cursor = self.pool.reader().cursor()
+        cursor.execute(QUERIES["summary.verify"])
+
+        return [row['SongID'] for row in cursor.fetchall()]
+
+    # ============== Orphan Link Maintenance Methods ===============
+
+    # Junction rows whose song or linked row is gone can only come from deletes
+    # made w/o foreign keys enforced - older versions of this app, or other
+    # tools. They're never shown but every join still has to step over them.
+
+    def find_orphan_links(self):
+        # Count the orphaned rows in each junction table
+        cursor = self.pool.reader().cursor()
+        orphans = {}
+        for link_table, table, column in self.SONG_LINKS:
+            cursor.execute(f"SELECT COUNT(*) FROM {link_table} WHERE {_orphan_condition(link_table, table, column)}")
+            orphans[link_table] = cursor.fetchone()[0]
+        return orphans
+
+    def purge_orphan_links(self):
+        # Delete every orphaned junction row in one transaction - returns the
+        # number deleted from each table
+        purged = {}
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            for link_table, table, column in self.SONG_LINKS:
+                cursor.execute(f"DELETE FROM {link_table} WHERE {_orphan_condition(link_table, table, column)}")
+                purged[link_table] = cursor.rowcount
+        return purged
+
     # =========== Conjoining Table Methods ===================
 
+    # (link table, entity table, entity ID column) for each kind of song link
+    SONG_LINKS = [
+        ("Plays", "Artist", "ArtistID"),
+        ("IsOn", "Album", "AlbumID"),
+        ("IsIn", "Category", "CategoryID"),
+    ]
+    # (ID check, link insert) QUERIES for each entry of SONG_LINKS
+    SONG_LINK_QUERIES = [
+        ("artist.existing", "plays.insert"),
+        ("album.existing", "ison.insert"),
+        ("category.existing", "isin.insert"),
+    ]
+
+    def add_links_to_song(self, song_id: int, artist_ids: Iterable[int] = (),
+                          album_ids: Iterable[int] = (), category_ids: Iterable[int] = ()):
+        # Add many links to a song in one transaction - one executemany per
+        # link table. Raises ValueError (& writes nothing) for unknown IDs.
+        # The IDs are checked as one JSON array, so every call shares one
+        # compiled statement per table whatever the number of IDs
+        links = zip(self.SONG_LINKS, self.SONG_LINK_QUERIES, (artist_ids, album_ids, category_ids))
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            for (link, table, column), (check, insert), ids in links:
+                ids = list(dict.fromkeys(ids))
+                if not ids:
+                    continue
+                cursor.execute(QUERIES[check], (json.dumps(ids),))
+                missing = set(ids) - {row[0] for row in cursor.fetchall()}
+                if missing:
+                    raise ValueError(f"No {table} with ID {', '.join(map(str, sorted(missing)))}")
+                cursor.executemany(QUERIES[insert], [(song_id, entity_id) for entity_id in ids])
+
     def add_artist_to_song(self, song_id: int, artist_id: int):
         # Add an artist to a song (Plays relationship)
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT OR IGNORE INTO Plays (SongID, ArtistID) VALUES (?, ?)", 
-                      (song_id, artist_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["plays.insert"], (song_id, artist_id))
     
     def remove_artist_from_song(self, song_id: int, artist_id: int):
         # Remove an artist from a song
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM Plays WHERE SongID = ? AND ArtistID = ?", 
-                      (song_id, artist_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["plays.delete"], (song_id, artist_id))
     
     def get_artists_for_song(self, song_id: int) -> List[sqlite3.Row]:
         # Get all artists for a song
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT a.ArtistID, a.Name
-            FROM Artist a
-            JOIN Plays p ON a.ArtistID = p.ArtistID
-            WHERE p.SongID = ?
-            ORDER BY a.Name
-        """, (song_id,))
+        cursor = self.pool.reader().cursor()
+        cursor.execute(QUERIES["song.artists"], (song_id,))
         return cursor.fetchall()
     
     def add_category_to_song(self, song_id: int, category_id: int):
         # Add a category to a song (IsIn relationship)
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT OR IGNORE INTO IsIn (CategoryID, SongID) VALUES (?, ?)", 
-                      (category_id, song_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["isin.insert"], (song_id, category_id))
     
     def remove_category_from_song(self, song_id: int, category_id: int):
         # Remove a category from song entity
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM IsIn WHERE CategoryID = ? AND SongID = ?", 
-                      (category_id, song_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["isin.delete"], (song_id, category_id))
     
     def get_categories_for_song(self, song_id: int) -> List[sqlite3.Row]:
         # Get all categories for a song
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT c.CategoryID, c.CategoryName
-            FROM Category c
-            JOIN IsIn i ON c.CategoryID = i.CategoryID
-            WHERE i.SongID = ?
-            ORDER BY c.CategoryName
-        """, (song_id,))
+        cursor = self.pool.reader().cursor()
+        cursor.execute(QUERIES["song.categories"], (song_id,))
         return cursor.fetchall()
     
     def add_song_to_album(self, song_id: int, album_id: int):
         # Add a song to an album (IsOn relationship)
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT OR IGNORE INTO IsOn (SongID, AlbumID) VALUES (?, ?)", 
-                      (song_id, album_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["ison.insert"], (song_id, album_id))
     
     def remove_song_from_album(self, song_id: int, album_id: int):
         # Remove a song from an album
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM IsOn WHERE SongID = ? AND AlbumID = ?", 
-                      (song_id, album_id))
-        self.connection.commit()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUERIES["ison.delete"], (song_id, album_id))
     
     def get_albums_for_song(self, song_id: int) -> List[sqlite3.Row]:
         # Get all albums for a song
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT a.AlbumID, a.Title, a.Year
-            FROM Album a
-            JOIN IsOn i ON a.AlbumID = i.AlbumID
-            WHERE i.SongID = ?
-            ORDER BY a.Title
-        """, (song_id,))
+        cursor = self.pool.reader().cursor()
+        cursor.execute(QUERIES["song.albums"], (song_id,))
         return cursor.fetchall()  
 
     # =============== Report Generation Methods ====================
 
-    def see_all_songs_played_by_artist(self, name: str):
+    # Rows fetched per trip by the stream_* report methods
+    STREAM_ARRAYSIZE = 500
+
+    def see_all_songs_played_by_artist(self, name: str, row_format: str = "row"):
         # Retrieve all songs played by input artist
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT s.Title AS Title, a.Name AS ArtistName 
-            FROM Song s
-            JOIN Plays p ON s.SongID = p.SongID
-            JOIN Artist a ON p.ArtistID = a.ArtistID
-            WHERE a.Name = ?
-            ORDER BY a.Name       
-         """, (name,))
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["report.songs_by_artist"], (name,))
         return cursor.fetchall()
     
-    def see_all_artists_with_albums_in_year(self, year: int):
-        # Retrieve all artist names w/ albums in input year
-        cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT DISTINCT a.Name AS Artist
-            FROM Artist a
-            JOIN Plays p ON a.ArtistID = p.ArtistID
-            JOIN Song s ON p.SongID = s.SongID
-            JOIN IsOn io ON s.SongID = io.SongID
-            JOIN Album al ON io.AlbumID = al.AlbumID
-            WHERE al.Year = ?
-            ORDER BY a.Name             
-            """, (year,))
-        return cursor.fetchall()
+    def get_artist_discography(self, name: str, use_cache: bool = True):
+        # Every song by an artist grouped by album (oldest first, songs w/o an
+        # album last) w/ each song's categories - two set-based queries in
+        # one read transaction, however many songs the artist has
+        # Returns None for an unknown artist, otherwise
+        #   {"artist_id", "artist", "songs", "albums": [{"album_id", "title",
+        #    "year", "categories", "songs": [{"song_id", "title", "categories"}]}]}
+        # Results are cached until the next write through this instance -
+        # treat them as read-only
+        if not use_cache:
+            return self._read_discography(name)
+        # Read the generation first so a write that lands mid-query leaves
+        # this (possibly stale) result already retired
+        generation = self.pool.write_generation
+        cached = self.discography_cache.get(name)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        discography = self._read_discography(name)
+        self.discography_cache.put(name, (generation, discography))
+        return discography
+
+    def _read_discography(self, name: str):
+        artist = self.get_artist_by_name(name)
+        if artist is None:
+            return None
+        connection = self.pool.reader()
+        cursor = connection.cursor()
+        cursor.row_factory = None
+        # Both queries read the same snapshot (unless the caller already
+        # holds a read transaction open, which gives the same guarantee)
+        began = not connection.in_transaction
+        if began:
+            connection.execute("BEGIN")
+        try:
+            songs = cursor.execute(QUERIES["discography.songs"], (artist['ArtistID'],)).fetchall()
+            categories = {}
+            for song_id, category in cursor.execute(QUERIES["discography.categories"],
+                                                    (artist['ArtistID'],)):
+                categories.setdefault(song_id, []).append(category)
+        finally:
+            if began and connection.in_transaction:
+                connection.rollback()
+
+        albums = {}
+        for album_id, album_title, year, song_id, title in songs:
+            album = albums.get(album_id)
+            if album is None:
+                album = albums[album_id] = {"album_id": album_id, "title": album_title, "year": year,
+                                            "categories": set(), "songs": []}
+            song_categories = categories.get(song_id, [])
+            album["categories"].update(song_categories)
+            album["songs"].append({"song_id": song_id, "title": title, "categories": song_categories})
+        for album in albums.values():
+            album["categories"] = sorted(album["categories"])
+        return {
+            "artist_id": artist['ArtistID'],
+            "artist": artist['Name'],
+            "songs": len({song_id for (_, _, _, song_id, _) in songs}),
+            "albums": list(albums.values()),
+        }
+
+    def see_all_artists_with_albums_in_year(self, year: int, allow_stale: bool = False,
+                                            row_format: str = "row"):
+        # Retrieve all artist names w/ albums in input year - answered from
+        # the ArtistYear cube (see REPORT_CUBES)
+        query = self._year_report_query(year, allow_stale)
+        if query is None:
+            return ReportRows([], fresh=True)
+        sql, params, fresh = query
+        cursor = self._reader_cursor(row_format)
+        return ReportRows(cursor.execute(sql, params).fetchall(), fresh)
     
-    def see_all_albums_in_category(self, category: str):
-        # Find all albums w/ songs in the input category
+    def see_all_albums_in_category(self, category: str, allow_stale: bool = False,
+                                   row_format: str = "row"):
+        # Find all albums w/ songs in the input category - answered from the
+        # CategoryAlbums cube (see REPORT_CUBES)
+        query = self._category_report_query(category, allow_stale)
+        if query is None:
+            return ReportRows([], fresh=True)
+        sql, params, fresh = query
+        cursor = self._reader_cursor(row_format)
+        return ReportRows(cursor.execute(sql, params).fetchall(), fresh)
+
+    # Streaming versions of the reports - rows are yielded as they're read,
+    # arraysize at a time, so the first rows arrive before the query finishes
+    # & memory stays at one chunk. The read stays open until the generator is
+    # exhausted or closed.
+
+    def stream_songs_played_by_artist(self, name: str, arraysize: int = None,
+                                      row_format: str = "row"):
+        # Stream all songs played by input artist
+        yield from self._stream(QUERIES["report.songs_by_artist"], (name,), arraysize, row_format)
+
+    def stream_artists_with_albums_in_year(self, year: int, arraysize: int = None,
+                                           allow_stale: bool = False, row_format: str = "row"):
+        # Stream all artist names w/ albums in input year
+        query = self._year_report_query(year, allow_stale)
+        if query is not None:
+            yield from self._stream(query[0], query[1], arraysize, row_format)
+
+    def stream_albums_in_category(self, category: str, arraysize: int = None,
+                                  allow_stale: bool = False, row_format: str = "row"):
+        # Stream all albums w/ songs in the input category
+        query = self._category_report_query(category, allow_stale)
+        if query is not None:
+            yield from self._stream(query[0], query[1], arraysize, row_format)
+
+    def _stream(self, sql: str, params: tuple, arraysize: int = None, row_format: str = "row"):
+        # Yield the rows of a query fetchmany(arraysize) rows at a time
+        cursor = self._reader_cursor(row_format)
+        cursor.arraysize = arraysize or self.STREAM_ARRAYSIZE
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def _year_report_query(self, year: int, allow_stale: bool):
+        # (sql, params, fresh) for the year report - None for a non-numeric year
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            return None
+        return self._cube_query("year", year, allow_stale)
+
+    def _category_report_query(self, category: str, allow_stale: bool):
+        # (sql, params, fresh) for the category report - None for an unknown category
+        row = self.get_category_by_name(category)
+        if row is None:
+            return None
+        return self._cube_query("category", row['CategoryID'], allow_stale)
+
+    # ================== Report Cube Methods ======================
+
+    # Cubes behind the reports, by CubeDirty kind: the cube table, its key
+    # column, the report columns & the live query that computes the cube
+    # (filtered on "slice" = ? for a single slice)
+    REPORT_CUBES = {
+        "year": {
+            "table": "ArtistYear",
+            "key": "Year",
+            "columns": "Artist",
+            "live": """
+                SELECT DISTINCT al.Year AS Year, a.Name AS Artist
+                FROM Album al
+                JOIN IsOn io ON al.AlbumID = io.AlbumID
+                JOIN Song s ON io.SongID = s.SongID
+                JOIN Plays p ON s.SongID = p.SongID
+                JOIN Artist a ON p.ArtistID = a.ArtistID
+            """,
+            "slice": "al.Year",
+        },
+        "category": {
+            "table": "CategoryAlbums",
+            "key": "CategoryID",
+            "columns": "AlbumTitle, ArtistName",
+            "live": """
+                SELECT DISTINCT ii.CategoryID AS CategoryID, al.Title AS AlbumTitle, a.Name AS ArtistName
+                FROM IsIn ii
+                JOIN Category c ON ii.CategoryID = c.CategoryID
+                JOIN Song s ON ii.SongID = s.SongID
+                JOIN IsOn io ON s.SongID = io.SongID
+                JOIN Album al ON io.AlbumID = al.AlbumID
+                JOIN Plays p ON s.SongID = p.SongID
+                JOIN Artist a ON p.ArtistID = a.ArtistID
+            """,
+            "slice": "ii.CategoryID",
+        },
+    }
+
+    def _cube_query(self, kind: str, key: int, allow_stale: bool):
+        # (sql, params, fresh) reading a report from its cube slice, refreshing
+        # the slice first if a change has touched it. w/ allow_stale the slice
+        # is read as it is (fresh=False when dirty); read-only connections
+        # can't refresh, so they fall back to the live query instead.
+        cube = self.REPORT_CUBES[kind]
+        dirty = self.pool.reader().execute(QUERIES["cube.is_dirty"], (kind, key)).fetchone() is not None
+        if dirty and not allow_stale:
+            if self.read_only:
+                return (f"SELECT {cube['columns']} FROM ({cube['live']} WHERE {cube['slice']} = ?) "
+                        f"ORDER BY {cube['columns']}", (key,), True)
+            with self.pool.writer() as connection:
+                self._refresh_cube_slice(connection, kind, key)
+            dirty = False
+        return (f"SELECT {cube['columns']} FROM {cube['table']} WHERE {cube['key']} = ? "
+                f"ORDER BY {cube['columns']}", (key,), not dirty)
+
+    def _refresh_cube_slice(self, connection: sqlite3.Connection, kind: str, key: int):
+        # Recompute one slice from the live tables - skipped if another thread
+        # already refreshed it while this one waited for the writer
+        cube = self.REPORT_CUBES[kind]
+        cursor = connection.cursor()
+        cursor.execute(QUERIES["cube.clean"], (kind, key))
+        if cursor.rowcount == 0:
+            return
+        cursor.execute(f"DELETE FROM {cube['table']} WHERE {cube['key']} = ?", (key,))
+        cursor.execute(f"INSERT INTO {cube['table']} ({cube['key']}, {cube['columns']}) "
+                       f"{cube['live']} WHERE {cube['slice']} = ?", (key,))
+
+    def refresh_report_cubes(self):
+        # Refresh every dirty slice now (e.g. after a bulk import, before a
+        # dashboard asks for every year) - returns the number refreshed
+        with self.pool.writer() as connection:
+            dirty = connection.execute(QUERIES["cube.dirty"]).fetchall()
+            for kind, key in dirty:
+                self._refresh_cube_slice(connection, kind, key)
+        return len(dirty)
+
+    def rebuild_report_cubes(self):
+        # Recompute both cubes from scratch
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            for cube in self.REPORT_CUBES.values():
+                cursor.execute(f"DELETE FROM {cube['table']}")
+                cursor.execute(f"INSERT INTO {cube['table']} ({cube['key']}, {cube['columns']}) {cube['live']}")
+            cursor.execute(QUERIES["cube.clean_all"])
+
+    def get_cube_status(self):
+        # Rows in each cube & how many of its slices are waiting for a refresh
+        reader = self.pool.reader()
+        return {kind: {
+                    "rows": reader.execute(f"SELECT COUNT(*) FROM {cube['table']}").fetchone()[0],
+                    "dirty": reader.execute(QUERIES["cube.dirty_count"], (kind,)).fetchone()[0],
+                } for kind, cube in self.REPORT_CUBES.items()}
+
+    # ==================== Search Methods ======================
+
+    # Matches ranked per search - keeps very common prefixes ('the', 's')
+    # from ranking millions of rows; selective searches rank every match
+    SEARCH_CANDIDATES = 2000
+    # Names starting w/ the query's words checked for an unusual casing of it
+    # - the usual casings come straight off the name indexes
+    SEARCH_NAME_CANDIDATES = 200
+
+    def search(self, query: str, limit: int = 20, row_format: str = "row"):
+        # Ranked full-text search across artist, category, album & song names
+        # Names equal to the query come first, then every word is matched as
+        # a prefix - rows matching all of the words rank ahead of rows matching
+        # any of them. When no name has all of the words, misspelled words are
+        # corrected against the index's vocabulary (see _correct_word) first.
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        results = []
+        # (Kind, ID) by position, so every row format works
+        seen = set()
+
+        def add(rows):
+            for row in rows:
+                if (row[0], row[1]) not in seen and len(results) < limit:
+                    seen.add((row[0], row[1]))
+                    results.append(row)
+
+        terms = [f'"{word}"*' for word in words]
+        self._search_name(words, " ".join(query.split()), limit, row_format, add)
+        if len(results) < limit:
+            add(self._search_match(" AND ".join(terms), limit, row_format))
+        if len(results) == 0:
+            # No name has all the words - retry w/ misspelled words corrected
+            corrections = [self._correct_word(word) for word in words]
+            if any(corrections):
+                best = [corrected[0] if corrected else word for word, corrected in zip(words, corrections)]
+                self._search_name(best, " ".join(best), limit, row_format, add)
+                terms = ["(" + " OR ".join(f'"{term}"' for term in corrected) + ")" if corrected
+                         else f'"{word}"*' for word, corrected in zip(words, corrections)]
+                add(self._search_match(" AND ".join(terms), limit, row_format))
+        if len(results) < limit and len(terms) > 1:
+            add(self._search_match(" OR ".join(terms), limit, row_format))
+        return results
+
+    def _search_name(self, words: list, name: str, limit: int, row_format: str, add):
+        # Names equal to name, ignoring case. Its usual spellings (as typed,
+        # lower, Capitalized, Title Case & UPPER) are looked up on the name
+        # indexes, so they're found however many names share its words.
+        # Other casings are picked out of the first SEARCH_NAME_CANDIDATES names
+        # starting w/ its words - compared casefolded in Python, since
+        # SQLite's lower() only folds ASCII
+        spellings = list(dict.fromkeys(spell(name) for spell in
+                                       (str, str.lower, str.capitalize, str.title, str.upper)))
+        cursor = self._reader_cursor(row_format)
+        add(cursor.execute(QUERIES["search.name"], (json.dumps(spellings), limit)))
+
+        folded = _fold_name(name)
+        phrase = '^"' + " ".join(words) + '"'
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["search.name_candidates"], (phrase, self.SEARCH_NAME_CANDIDATES))
+        add(row for row in cursor if _fold_name(row[2]) == folded)
+
+    def _search_match(self, match: str, limit: int, row_format: str = "row"):
+        # Run one FTS5 MATCH - rowid is decoded back into the kind & source ID
+        cursor = self._reader_cursor(row_format)
+        cursor.execute(QUERIES["search.match"], (match, max(limit, self.SEARCH_CANDIDATES), limit))
+        return cursor.fetchall()
+
+    # Spelling corrections tried per misspelled word
+    SEARCH_CORRECTIONS = 3
+
+    def _correct_word(self, word: str):
+        # Indexed words within one typo of word (two for words of 5+ letters)
+        # - a wrong, missing, extra or swapped letter - most common first
+        # Empty when word already starts an indexed word, is a number or is
+        # under 3 letters. Only words starting
+        # w/ word's first letter, its second letter (first letter missing) or
+        # its first two letters swapped are read, so reading the vocabulary
+        # stays a few index range scans; a wrong first letter isn't corrected.
+        if len(word) < 3 or word.isdigit():
+            # Too short to guess at, & numbers aren't misspelled
+            return []
+        max_distance = 1 if len(word) < 5 else 2
+        prefixes = {word[0], word[1:3], word[1::-1]} - {""}
+        candidates = {}
+        for prefix in prefixes:
+            cursor = self.pool.reader().cursor()
+            cursor.row_factory = None
+            upper = _prefix_upper_bound(prefix)
+            for term, docs in cursor.execute(QUERIES["search.terms"], (
+                    prefix, upper, len(word) - max_distance, len(word) + max_distance)):
+                if term.startswith(word):
+                    return []
+                distance = _edit_distance(word, term, max_distance)
+                if distance <= max_distance:
+                    candidates[term] = (distance, -docs, term)
+        return sorted(candidates, key=candidates.get)[:self.SEARCH_CORRECTIONS]
+
+    def rebuild_search_index(self):
+        # Repopulate LibrarySearch from scratch - triggers keep it current after
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
+            for name in ("search.clear", "search.add_artists", "search.add_categories",
+                         "search.add_albums", "search.add_songs"):
+                cursor.execute(QUERIES[name])
+
+    # ================= Bulk Import Methods =====================
+
+    def bulk_import(self, records: Iterable[dict], batch_size: int = 1000,
+                    cache_size: int = 100000):
+        # Load a stream of artist/category/album/song records in one transaction
+        # Names are resolved to IDs in memory and rows are written w/ executemany
+        # Record shapes:
+        #   {"type": "artist", "name": ...}
+        #   {"type": "category", "name": ...}
+        #   {"type": "album", "title": ..., "year": ...}
+        #   {"type": "song", "title": ..., "artists": [...], "albums": [...],
+        #    "categories": [...], "year": ...}  (year is used for new albums)
+        # Records are consumed batch_size at a time & at most cache_size names
+        # per table are kept in memory, so the input can be any size
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        start = time.perf_counter()
+        with self.pool.writer() as connection:
+            # Take SQLite's write lock up front so pre-assigned IDs can't collide
+            connection.execute("BEGIN IMMEDIATE")
+            loader = _BulkLoader(connection, batch_size, cache_size)
+            chunk = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= batch_size:
+                    loader.add_chunk(chunk)
+                    chunk = []
+            loader.add_chunk(chunk)
+            loader.flush()
+        # Too many names may have been created to invalidate one by one
+        self.clear_name_cache()
+        # Planner statistics from before a large load would mislead it
+        maintenance.analyze(self, limit=maintenance.ANALYSIS_LIMIT)
+
+        elapsed = time.perf_counter() - start
+        rows = sum(loader.counts.values())
+        return {
+            "records": loader.records,
+            "rows": rows,
+            "counts": dict(loader.counts),
+            "lookups": loader.lookups,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+# Marks a cache miss - None is a valid cached value (name not found)
+_MISSING = object()
+
+# Thread-safe bounded LRU cache w/ hit/miss/eviction counters
+# generation changes on every invalidation so a reader can tell whether the
+# value it just fetched may already be out of date (see put)
+class LRUCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, generation: int = None):
+        # Skip the put if an invalidation happened since generation was read
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Helper for MusicDatabase.bulk_import - resolves names for a whole chunk of
+# records at once and holds pending rows for each table until a batch is full
+class _BulkLoader:
+    # Flush order keeps entity rows ahead of the junction rows that reference them
+    TABLES = [
+        ("Artist", "INSERT INTO Artist (ArtistID, Name) VALUES (?, ?)"),
+        ("Category", "INSERT INTO Category (CategoryID, CategoryName) VALUES (?, ?)"),
+        ("Album", "INSERT INTO Album (AlbumID, Title, Year) VALUES (?, ?, ?)"),
+        ("Song", "INSERT INTO Song (SongID, Title) VALUES (?, ?)"),
+        ("Plays", "INSERT OR IGNORE INTO Plays (SongID, ArtistID) VALUES (?, ?)"),
+        ("IsOn", "INSERT OR IGNORE INTO IsOn (SongID, AlbumID) VALUES (?, ?)"),
+        ("IsIn", "INSERT OR IGNORE INTO IsIn (CategoryID, SongID) VALUES (?, ?)"),
+    ]
+
+    # Queries that resolve a set of names in one round trip
+    # Album titles aren't unique: an album w/ a year is matched on
+    # (Title, Year) - "AlbumYear" - & only a year-less reference falls back to
+    # the first album w/ that title
+    LOOKUPS = {
+        "Artist": "SELECT Name, ArtistID FROM Artist WHERE Name IN ({})",
+        "Category": "SELECT CategoryName, CategoryID FROM Category WHERE CategoryName IN ({})",
+        "Album": "SELECT Title, MIN(AlbumID) FROM Album WHERE Title IN ({}) GROUP BY Title",
+        "AlbumYear": """
+            SELECT Title, Year, MIN(AlbumID) FROM Album
+            WHERE (Title, Year) IN (VALUES {}) GROUP BY Title, Year
+        """,
+    }
+
+    # Stay well under SQLite's bound parameter limit
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, connection: sqlite3.Connection, batch_size: int, cache_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.records = 0
+        self.lookups = 0
+        self.pending = {table: [] for table, _ in self.TABLES}
+        self.pending_rows = 0
+        self.counts = {table: 0 for table, _ in self.TABLES}
+
+        # Names seen across chunks (bounded) & names used by the current chunk
+        self.cache = {table: LRUCache(cache_size) for table in self.LOOKUPS}
+        self.resolved = {table: {} for table in self.LOOKUPS}
+
+        # IDs are assigned here so songs can be linked without a lastrowid per row
+        self.next_id = {
+            "Artist": self._next_id("Artist", "ArtistID"),
+            "Category": self._next_id("Category", "CategoryID"),
+            "Album": self._next_id("Album", "AlbumID"),
+            "Song": self._next_id("Song", "SongID"),
+        }
+
+    def _next_id(self, table: str, id_field: str):
+        # Respect AUTOINCREMENT - never reuse an ID handed out before
+        cursor = self.connection.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+                COALESCE((SELECT MAX({id_field}) FROM {table}), 0)
+            ) + 1
+        """, (table,))
+        return cursor.fetchone()[0]
+
+    def _assign_id(self, table: str):
+        new_id = self.next_id[table]
+        self.next_id[table] += 1
+        return new_id
+
+    def _queue(self, table: str, row: tuple):
+        self.pending[table].append(row)
+        self.pending_rows += 1
+        if self.pending_rows >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Write every pending row w/ one executemany per table
         cursor = self.connection.cursor()
-        cursor.execute("""
-            SELECT DISTINCT al.Title AS AlbumTitle, a.Name AS ArtistName
-            FROM Album al
-            JOIN IsOn io ON al.AlbumID = io.AlbumID
-            JOIN Song s ON io.SongID = s.SongID
-            JOIN Plays p ON s.SongID = p.SongID
-            JOIN Artist a ON p.ArtistID = a.ArtistID
-            JOIN IsIn ii ON s.SongID = ii.SongID
-            JOIN Category c ON ii.CategoryID = c.CategoryID
-            WHERE c.CategoryName = ?
-            ORDER BY al.Title   
-            """, (category,))
-        return cursor.fetchall()
\ No newline at end of file
+        for table, sql in self.TABLES:
+            rows = self.pending[table]
+            if rows:
+                cursor.executemany(sql, rows)
+                # rowcount skips links that INSERT OR IGNORE left out
+                self.counts[table] += cursor.rowcount
+                self.pending[table] = []
+        self.pending_rows = 0
+
+    def _resolve(self, table: str, names: set):
+        # Fill self.resolved for every name in the chunk - cached names first,
+        # then one IN (...) query per LOOKUP_CHUNK names for the rest
+        resolved = self.resolved[table]
+        missing = []
+        for name in names:
+            known = self.cache[table].get(name)
+            if known is None:
+                missing.append(name)
+            else:
+                resolved[name] = known
+        if not missing:
+            return
+
+        # Rows created earlier in this import must be visible to the lookup
+        self.flush()
+        cursor = self.connection.cursor()
+        cursor.row_factory = None
+        for i in range(0, len(missing), self.LOOKUP_CHUNK):
+            part = missing[i:i + self.LOOKUP_CHUNK]
+            self.lookups += 1
+            if table == "AlbumYear":
+                # (title, year) keys - one (?, ?) row value per key
+                sql = self.LOOKUPS[table].format(", ".join(["(?, ?)"] * len(part)))
+                rows = ((key[:2], key[2]) for key in cursor.execute(sql, [v for key in part for v in key]))
+            else:
+                sql = self.LOOKUPS[table].format(", ".join("?" * len(part)))
+                rows = cursor.execute(sql, part)
+            for name, found_id in rows:
+                resolved[name] = found_id
+                self.cache[table].put(name, found_id)
+
+    def _id_for(self, table: str, name: str, row: tuple = ()):
+        # Look up a name resolved for this chunk or create it
+        resolved = self.resolved[table]
+        if name not in resolved:
+            resolved[name] = self._assign_id(table)
+            self.cache[table].put(name, resolved[name])
+            self._queue(table, (resolved[name], name) + row)
+        return resolved[name]
+
+    def artist_id(self, name: str):
+        return self._id_for("Artist", name)
+
+    def category_id(self, name: str):
+        return self._id_for("Category", name)
+
+    def album_id(self, title: str, year):
+        # The album w/ this title & year (created if there isn't one) - or w/o
+        # a year, the first album w/ this title
+        year = _album_year(year)
+        if year is None:
+            if title in self.resolved["Album"]:
+                return self.resolved["Album"][title]
+            raise ValueError(f"Album '{title}' needs a year to be created")
+        key = (title, year)
+        if key not in self.resolved["AlbumYear"]:
+            album_id = self.resolved["AlbumYear"][key] = self._assign_id("Album")
+            self.cache["AlbumYear"].put(key, album_id)
+            self._queue("Album", (album_id, title, year))
+            # A year-less reference later in this chunk can use it if the title
+            # wasn't found (later chunks look the first album up again)
+            self.resolved["Album"].setdefault(title, album_id)
+        return self.resolved["AlbumYear"][key]
+
+    def _add_album_name(self, names: dict, title: str, year):
+        # Queue a title - or (title, year) - for this chunk's lookups
+        year = _album_year(year)
+        if year is None:
+            names["Album"].add(title)
+        else:
+            names["AlbumYear"].add((title, year))
+
+    def add_chunk(self, records: list):
+        # Resolve every name the chunk mentions up front, then queue its rows
+        names = {table: set() for table in self.LOOKUPS}
+        for record in records:
+            record_type = record.get("type", "song")
+            if record_type in ("artist", "category"):
+                names[record_type.capitalize()].add(record["name"])
+            elif record_type == "album":
+                self._add_album_name(names, record["title"], record.get("year"))
+            elif record_type == "song":
+                names["Artist"].update(_as_list(record.get("artists")))
+                for title, year in _album_refs(record):
+                    self._add_album_name(names, title, year)
+                names["Category"].update(_as_list(record.get("categories")))
+
+        for table, chunk_names in names.items():
+            self._resolve(table, chunk_names)
+        for record in records:
+            self.add(record)
+        for table in self.resolved:
+            self.resolved[table] = {}
+
+    def add(self, record: dict):
+        self.records += 1
+        record_type = record.get("type", "song")
+
+        if record_type == "artist":
+            self.artist_id(record["name"])
+        elif record_type == "category":
+            self.category_id(record["name"])
+        elif record_type == "album":
+            self.album_id(record["title"], record.get("year"))
+        elif record_type == "song":
+            song_id = self._assign_id("Song")
+            self._queue("Song", (song_id, record["title"]))
+            for name in _as_list(record.get("artists")):
+                self._queue("Plays", (song_id, self.artist_id(name)))
+            for title, year in _album_refs(record):
+                self._queue("IsOn", (song_id, self.album_id(title, year)))
+            for name in _as_list(record.get("categories")):
+                self._queue("IsIn", (self.category_id(name), song_id))
+        else:
+            raise ValueError(f"Unknown record type: {record_type}")
+
+# ===== Statement Cache Size =====
+
+# Statements built at run time that a connection may also hold compiled,
+# counted from the tables they're built from - a new kind, link or cube
+# grows the cache w/ it
+DYNAMIC_STATEMENTS = (
+    # delete_many: select by names, select by where, delete the rows;
+    # rename_many: mark outcomes, rename - plus one link delete per link table
+    5 * len(MusicDatabase.BULK_TABLES) + len(MusicDatabase.SONG_LINKS)
+    # Cube read, live fallback, slice delete & insert, rebuild delete &
+    # insert, row count
+    + 7 * len(MusicDatabase.REPORT_CUBES)
+    # Orphan count & purge
+    + 2 * len(MusicDatabase.SONG_LINKS)
+    # Artist, category & album prefix pages, w/ & w/o an upper bound
+    + 2 * 3
+    # Bulk import: row inserts, full-chunk lookups & next ID per entity table
+    + len(_BulkLoader.TABLES) + len(_BulkLoader.LOOKUPS) + len(MusicDatabase.BULK_TABLES)
+    # PRAGMA reads for pragma inspection
+    + len(INSPECTED_PRAGMAS)
+)
+
+# Headroom for statements whose text isn't fixed - where predicates passed to
+# delete_many, partly filled lookup chunks, PRAGMA writes, export &
+# maintenance queries. Not a count: evicting these costs one recompile each
+STATEMENT_HEADROOM = 32
+
+# Compiled statements each connection keeps (sqlite3's default is 128) - big
+# enough that a long session never evicts & recompiles a registry query
+STATEMENT_CACHE_SIZE = len(QUERIES) + DYNAMIC_STATEMENTS + STATEMENT_HEADROOM
+
+
+# Report results - a list of rows that also says whether the cube it was read
+# from was up to date
+class ReportRows(list):
+    def __init__(self, rows, fresh: bool):
+        super().__init__(rows)
+        self.fresh = fresh
+
+def _fold_name(name: str):
+    # Name compared for an exact search match - case folded (Unicode, not just
+    # ASCII) & runs of whitespace collapsed
+    return " ".join(name.casefold().split())
+
+def _prefix_upper_bound(prefix: str):
+    # Smallest string greater than every string starting w/ prefix - None
+    # when there isn't one (empty prefix, or it ends w/ the last code point)
+    if not prefix or prefix[-1] == chr(0x10FFFF):
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _edit_distance(a: str, b: str, limit: int):
+    # Edits (insert, delete, replace or swap two neighbours) turning a into b
+    # - anything over limit is reported as limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+# WHERE clause matching junction rows whose song or linked row no longer exists
+def _orphan_condition(link_table: str, table: str, column: str):
+    return (f"NOT EXISTS (SELECT 1 FROM Song s WHERE s.SongID = {link_table}.SongID) "
+            f"OR NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{column} = {link_table}.{column})")
+
+# An import record's album year as an int - None when it has none
+def _album_year(year):
+    if year is None or year == "":
+        return None
+    return int(year)
+
+# Accept a single name or a list of names in import records
+def _as_list(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, (str, dict)):
+        return [value]
+    return list(value)
+
+# (title, year) of every album a song record names - an album is a title
+# (taking the record's year) or {"title": ..., "year": ...}
+def _album_refs(record: dict):
+    for album in _as_list(record.get("albums")):
+        if isinstance(album, dict):
+            yield album["title"], album.get("year", record.get("year"))
+        else:
+            yield album, record.get("year")
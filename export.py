@@ -0,0 +1,367 @@
+import array
+import csv
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from database import MusicDatabase
+
+# Export module - streams every song w/ its artists, albums & categories out
+# of MusicDatabase into CSV, JSONL or a compact columnar file (.mcol)
+#
+#   export_library(db, "library.csv")
+#   export_library(db, "library.jsonl.gz")
+#   export_library(db, "library.mcol")
+#   for song in read_columnar("library.mcol"): ...
+#
+# Songs are read chunk_size at a time in SongID order, w/ one query per link
+# table per chunk, so memory stays at one chunk however large the library is.
+# The whole export reads a single snapshot of the database - writes made while
+# it runs aren't half included.
+#
+# Each song is a dict:
+#   {"id": 1, "title": ..., "artists": [names], "albums": [(title, year)], "categories": [names]}
+
+EXPORT_FORMATS = ["csv", "jsonl", "columnar"]
+
+# File extensions for each format (a trailing .gz compresses csv & jsonl)
+FORMAT_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".mcol": "columnar"}
+
+# ===================== Reading Songs =====================
+
+def iter_song_chunks(db: MusicDatabase, chunk_size: int = 10000):
+    # Yield lists of up to chunk_size songs in SongID order
+    # Songs are paged by SongID & their links are fetched for the whole
+    # chunk's SongID range at once - a range scan of each link table's key
+    cursor = db.pool.reader().cursor()
+    cursor.row_factory = None
+    last_id = 0
+    while True:
+        cursor.execute("SELECT SongID, Title FROM Song WHERE SongID > ? ORDER BY SongID LIMIT ?",
+                       (last_id, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        first_id, last_id = rows[0][0], rows[-1][0]
+        songs = {song_id: {"id": song_id, "title": title, "artists": [], "albums": [], "categories": []}
+                 for song_id, title in rows}
+
+        cursor.execute("""
+            SELECT p.SongID, a.Name FROM Plays p JOIN Artist a ON a.ArtistID = p.ArtistID
+            WHERE p.SongID BETWEEN ? AND ? ORDER BY p.SongID, a.Name
+        """, (first_id, last_id))
+        for song_id, name in cursor:
+            if song_id in songs:
+                songs[song_id]["artists"].append(name)
+
+        cursor.execute("""
+            SELECT io.SongID, al.Title, al.Year FROM IsOn io JOIN Album al ON al.AlbumID = io.AlbumID
+            WHERE io.SongID BETWEEN ? AND ? ORDER BY io.SongID, al.Title, al.AlbumID
+        """, (first_id, last_id))
+        for song_id, title, year in cursor:
+            if song_id in songs:
+                songs[song_id]["albums"].append((title, year))
+
+        cursor.execute("""
+            SELECT ii.SongID, c.CategoryName FROM IsIn ii JOIN Category c ON c.CategoryID = ii.CategoryID
+            WHERE ii.SongID BETWEEN ? AND ? ORDER BY ii.SongID, c.CategoryName
+        """, (first_id, last_id))
+        for song_id, name in cursor:
+            if song_id in songs:
+                songs[song_id]["categories"].append(name)
+
+        yield list(songs.values())
+        if len(rows) < chunk_size:
+            return
+
+def iter_entities(db: MusicDatabase, sql: str, chunk_size: int = 10000):
+    # Stream the rows of a query fetchmany(chunk_size) at a time
+    cursor = db.pool.reader().cursor()
+    cursor.row_factory = None
+    cursor.arraysize = chunk_size
+    cursor.execute(sql)
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+# ===================== CSV & JSONL =====================
+
+# One row per song in the catalog layout `import` reads - several names in one
+# column are joined w/ separator & year is the year of the song's first album
+class CsvWriter:
+    def __init__(self, f, separator: str = ";"):
+        self.separator = separator
+        self.writer = csv.writer(f, lineterminator="\n")
+        self.writer.writerow(["song_id", "title", "artist", "album", "year", "category"])
+
+    def write_chunk(self, songs: list):
+        join = self.separator.join
+        self.writer.writerows(
+            (song["id"], song["title"], join(song["artists"]),
+             join(title for title, year in song["albums"]),
+             song["albums"][0][1] if song["albums"] else "",
+             join(song["categories"]))
+            for song in songs)
+
+    def close(self):
+        pass
+
+# Bulk import records - every artist, category & album first, then one song
+# record per song, so `import` can load the file into an empty library
+# Songs name each album w/ its year - titles aren't unique, (title, year) is
+class JsonlWriter:
+    def __init__(self, f, db: MusicDatabase, chunk_size: int = 10000):
+        self.f = f
+        dumps = json.dumps
+        for (name,) in iter_entities(db, "SELECT Name FROM Artist ORDER BY ArtistID", chunk_size):
+            f.write(dumps({"type": "artist", "name": name}) + "\n")
+        for (name,) in iter_entities(db, "SELECT CategoryName FROM Category ORDER BY CategoryID", chunk_size):
+            f.write(dumps({"type": "category", "name": name}) + "\n")
+        for title, year in iter_entities(db, "SELECT Title, Year FROM Album ORDER BY AlbumID", chunk_size):
+            f.write(dumps({"type": "album", "title": title, "year": year}) + "\n")
+
+    def write_chunk(self, songs: list):
+        dumps = json.dumps
+        self.f.write("".join(
+            dumps({"type": "song", "id": song["id"], "title": song["title"],
+                   "artists": song["artists"],
+                   "albums": [{"title": title, "year": year} for title, year in song["albums"]],
+                   "categories": song["categories"]}) + "\n"
+            for song in songs))
+
+    def close(self):
+        pass
+
+# ===================== Columnar Format =====================
+#
+# A .mcol file is a header followed by one block per chunk of songs:
+#
+#   header:  b"MCOL", u16 version, u16 flags
+#   block:   u8 codec (0 = raw, 1 = zlib), u32 payload length, payload
+#
+# A block's payload holds its columns one after another. Integer columns are
+# array module arrays (u8 typecode, u32 count, little-endian items) & string
+# columns are an array of UTF-8 byte lengths followed by the bytes (u32 length,
+# bytes). Names are dictionary encoded: each block first lists the artists,
+# albums & categories it adds to the file's dictionaries (codes continue from
+# the previous block), then the songs refer to them by code.
+#
+#   song_id            array q
+#   title              strings
+#   new_artists        strings
+#   new_categories     strings
+#   new_album_titles   strings
+#   new_album_years    array q
+#   artists            array I offsets (songs + 1), array I codes
+#   albums             array I offsets (songs + 1), array I codes
+#   categories         array I offsets (songs + 1), array I codes
+
+COLUMNAR_MAGIC = b"MCOL"
+COLUMNAR_VERSION = 1
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+# Link columns - (song dict key, dictionary it's encoded against)
+LINK_COLUMNS = [("artists", "artists"), ("albums", "albums"), ("categories", "categories")]
+
+def _pack_array(items: array.array):
+    if sys.byteorder == "big":
+        items = array.array(items.typecode, items)
+        items.byteswap()
+    return struct.pack("<cI", items.typecode.encode(), len(items)) + items.tobytes()
+
+def _pack_strings(strings: list):
+    encoded = [s.encode("utf-8") for s in strings]
+    blob = b"".join(encoded)
+    return _pack_array(array.array("I", map(len, encoded))) + struct.pack("<I", len(blob)) + blob
+
+class ColumnarWriter:
+    def __init__(self, f, compress: bool = True):
+        self.f = f
+        self.compress = compress
+        # Name -> code for everything written so far
+        self.dictionaries = {"artists": {}, "albums": {}, "categories": {}}
+        f.write(COLUMNAR_MAGIC + struct.pack("<HH", COLUMNAR_VERSION, 0))
+
+    def write_chunk(self, songs: list):
+        new = {"artists": [], "albums": [], "categories": []}
+        links = {}
+        for key, dictionary_name in LINK_COLUMNS:
+            dictionary = self.dictionaries[dictionary_name]
+            added = new[dictionary_name]
+            offsets = array.array("I", [0])
+            codes = array.array("I")
+            for song in songs:
+                for value in song[key]:
+                    code = dictionary.get(value)
+                    if code is None:
+                        code = dictionary[value] = len(dictionary)
+                        added.append(value)
+                    codes.append(code)
+                offsets.append(len(codes))
+            links[key] = _pack_array(offsets) + _pack_array(codes)
+
+        payload = b"".join([
+            _pack_array(array.array("q", (song["id"] for song in songs))),
+            _pack_strings([song["title"] for song in songs]),
+            _pack_strings(new["artists"]),
+            _pack_strings(new["categories"]),
+            _pack_strings([title for title, year in new["albums"]]),
+            _pack_array(array.array("q", (year for title, year in new["albums"]))),
+            links["artists"], links["albums"], links["categories"],
+        ])
+        codec = CODEC_RAW
+        if self.compress:
+            payload = zlib.compress(payload, 1)
+            codec = CODEC_ZLIB
+        self.f.write(struct.pack("<BI", codec, len(payload)) + payload)
+
+    def close(self):
+        pass
+
+class _BlockReader:
+    # Reads the columns of one block payload in order
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.position = 0
+
+    def array(self):
+        typecode, count = struct.unpack_from("<cI", self.payload, self.position)
+        self.position += 5
+        items = array.array(typecode.decode())
+        size = count * items.itemsize
+        items.frombytes(self.payload[self.position:self.position + size])
+        self.position += size
+        if sys.byteorder == "big":
+            items.byteswap()
+        return items
+
+    def strings(self):
+        lengths = self.array()
+        (size,) = struct.unpack_from("<I", self.payload, self.position)
+        self.position += 4
+        blob = self.payload[self.position:self.position + size]
+        self.position += size
+        strings = []
+        start = 0
+        for length in lengths:
+            strings.append(blob[start:start + length].decode("utf-8"))
+            start += length
+        return strings
+
+def read_columnar_chunks(path: str):
+    # Yield the columns of each block as a dict - link columns are
+    # (offsets, codes) arrays & "dictionaries" maps their codes back to names
+    dictionaries = {"artists": [], "albums": [], "categories": []}
+    with open(path, 'rb') as f:
+        header = f.read(8)
+        if len(header) < 8 or header[:4] != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        (version, _flags) = struct.unpack("<HH", header[4:])
+        if version != COLUMNAR_VERSION:
+            raise ValueError(f"{path}: unsupported columnar version {version}")
+
+        while True:
+            block_header = f.read(5)
+            if not block_header:
+                return
+            codec, size = struct.unpack("<BI", block_header)
+            payload = f.read(size)
+            if len(payload) < size:
+                raise ValueError(f"{path} is truncated")
+            if codec == CODEC_ZLIB:
+                payload = zlib.decompress(payload)
+
+            block = _BlockReader(payload)
+            columns = {"song_id": block.array(), "title": block.strings()}
+            dictionaries["artists"].extend(block.strings())
+            dictionaries["categories"].extend(block.strings())
+            titles = block.strings()
+            dictionaries["albums"].extend(zip(titles, block.array()))
+            for key, _dictionary_name in LINK_COLUMNS:
+                columns[key] = (block.array(), block.array())
+            columns["dictionaries"] = dictionaries
+            yield columns
+
+def read_columnar(path: str):
+    # Yield every song in a columnar export as a song dict
+    for columns in read_columnar_chunks(path):
+        dictionaries = columns["dictionaries"]
+        decoded = {}
+        for key, dictionary_name in LINK_COLUMNS:
+            offsets, codes = columns[key]
+            names = dictionaries[dictionary_name]
+            decoded[key] = [[names[code] for code in codes[offsets[i]:offsets[i + 1]]]
+                            for i in range(len(offsets) - 1)]
+        for i, song_id in enumerate(columns["song_id"]):
+            yield {"id": song_id, "title": columns["title"][i], "artists": decoded["artists"][i],
+                   "albums": decoded["albums"][i], "categories": decoded["categories"][i]}
+
+# ===================== Exporting =====================
+
+def export_format(path: str):
+    # Guess the export format from a file name - library.csv, library.jsonl.gz, ...
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Can't tell the export format of '{path}' - "
+                         f"use one of {', '.join(FORMAT_EXTENSIONS)} or give the format")
+    return FORMAT_EXTENSIONS[extension]
+
+def export_library(db: MusicDatabase, path: str, fmt: str = None, chunk_size: int = 10000,
+                   separator: str = ";", compress: bool = True):
+    # Write every song to path - returns the number of songs, bytes & timings
+    # The file is written under a temporary name & renamed when complete, so
+    # a failed or interrupted export never leaves a partial file at path
+    fmt = fmt or export_format(path)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_FORMATS)})")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    start = time.perf_counter()
+    temp_path = f"{path}.tmp"
+    connection = db.pool.reader()
+    songs = 0
+    try:
+        # One read transaction for the whole export - a consistent snapshot
+        connection.execute("BEGIN")
+        if fmt == "columnar":
+            f = open(temp_path, 'wb')
+        elif path.endswith(".gz"):
+            f = gzip.open(temp_path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+        else:
+            f = open(temp_path, 'w', encoding='utf-8', newline='')
+        with f:
+            if fmt == "csv":
+                writer = CsvWriter(f, separator)
+            elif fmt == "jsonl":
+                writer = JsonlWriter(f, db, chunk_size)
+            else:
+                writer = ColumnarWriter(f, compress)
+            for chunk in iter_song_chunks(db, chunk_size):
+                writer.write_chunk(chunk)
+                songs += len(chunk)
+            writer.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if connection.in_transaction:
+            connection.rollback()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "format": fmt,
+        "songs": songs,
+        "bytes": os.path.getsize(path),
+        "seconds": elapsed,
+        "songs_per_sec": songs / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,66 @@
+import csv
+import gzip
+import json
+import os
+
+# Importer module - reads catalog files as record streams that can be handed
+# straight to MusicDatabase.bulk_import without loading the file into memory
+
+def open_text(path: str):
+    # Open a catalog for reading as text - gzip compressed when it ends in .gz
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+# Catalog columns that can hold several names, e.g. "Queen;David Bowie"
+MULTI_VALUE_FIELDS = {"artist": "artists", "album": "albums", "category": "categories"}
+
+def read_jsonl(path: str):
+    # Yield one record per non-blank line of a JSON Lines file
+    with open_text(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}, line {line_number}: {e}") from e
+
+def read_csv(path: str):
+    # Yield one dict per CSV row, keyed by the lower-cased header names
+    with open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [name.strip().lower() for name in header]
+        for row in reader:
+            if row:
+                yield dict(zip(fields, row))
+
+def catalog_records(rows, separator: str = ";"):
+    # Turn catalog rows (title, artist, album, year, category) into song records
+    # Rows that already carry a "type" are passed through untouched
+    for row in rows:
+        if "type" in row:
+            yield row
+            continue
+
+        record = {"type": "song", "title": row["title"], "year": row.get("year")}
+        for field, plural in MULTI_VALUE_FIELDS.items():
+            value = row.get(plural, row.get(field))
+            if isinstance(value, str):
+                value = [name.strip() for name in value.split(separator) if name.strip()]
+            record[plural] = value
+        yield record
+
+def read_catalog(path: str, separator: str = ";"):
+    # Stream a .csv or .jsonl catalog (optionally .gz compressed) as bulk
+    # import records
+    name = path[:-3] if path.endswith(".gz") else path
+    if os.path.splitext(name)[1].lower() == ".csv":
+        rows = read_csv(path)
+    else:
+        rows = read_jsonl(path)
+    return catalog_records(rows, separator)
@@ -0,0 +1,232 @@
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+
+# Instrumentation module - opt-in timing for every MusicDatabase method
+# Records a latency histogram, call/row/error counts per method & keeps a log
+# of slow calls w/ the SQL they ran and its EXPLAIN QUERY PLAN output.
+#
+#   db.enable_instrumentation(slow_query_ms=50)
+#   ...
+#   db.get_stats()
+
+# Upper bounds (ms) of the latency histogram buckets - the last one is open
+LATENCY_BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, float("inf")]
+
+# MusicDatabase methods that are never wrapped
+SKIPPED_METHODS = {
+    "connect", "close", "open_connection", "apply_profile",
+    "enable_instrumentation", "disable_instrumentation", "get_stats", "reset_stats",
+}
+
+# Per-method counters & histogram
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.last_error = None
+
+    def record(self, elapsed_ms: float, rows: int, error: Exception = None):
+        self.calls += 1
+        self.rows += rows or 0
+        self.total_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        if error is not None:
+            self.errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def percentile(self, fraction: float):
+        # Upper bound of the bucket holding the given fraction of calls
+        target = self.calls * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "min_ms": self.min_ms or 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "histogram": {("inf" if bound == float("inf") else str(bound)): count
+                          for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+            "last_error": self.last_error,
+        }
+
+
+class Instrumentation:
+    def __init__(self, db, slow_query_ms: float = 100.0, slow_log_size: int = 100):
+        self.db = db
+        self.slow_query_ms = slow_query_ms
+        self.methods = {}
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        # SQL run by the method call in progress on each thread
+        self._local = threading.local()
+        self._wrapped = []
+
+    # ============ Attaching & Detaching ============
+
+    def attach(self):
+        # Wrap every public method on the instance & trace its connections
+        for name, method in inspect.getmembers(type(self.db), inspect.isfunction):
+            if name.startswith("_") or name in SKIPPED_METHODS:
+                continue
+            bound = getattr(self.db, name)
+            if inspect.isgeneratorfunction(method):
+                wrapped = self._wrap_generator(name, bound)
+            else:
+                wrapped = self._wrap(name, bound)
+            setattr(self.db, name, wrapped)
+            self._wrapped.append(name)
+
+        self.db.connection_hooks.append(self.trace_connection)
+        if self.db.pool:
+            for connection in self.db.pool.connections():
+                self.trace_connection(connection)
+
+    def detach(self):
+        # Restore the plain methods & stop tracing
+        for name in self._wrapped:
+            delattr(self.db, name)
+        self._wrapped = []
+        if self.trace_connection in self.db.connection_hooks:
+            self.db.connection_hooks.remove(self.trace_connection)
+        if self.db.pool:
+            for connection in self.db.pool.connections():
+                connection.set_trace_callback(None)
+
+    def trace_connection(self, connection):
+        connection.set_trace_callback(self._trace)
+
+    def _trace(self, sql: str):
+        # Collect the statements run by the current call - trigger bodies are
+        # reported as comments & repeated statements are only kept once
+        statements = getattr(self._local, "statements", None)
+        if statements is None or sql.startswith("--"):
+            return
+        if not statements or statements[-1] != sql:
+            statements.append(sql)
+
+    # ============ Method Wrappers ============
+
+    def _wrap(self, name: str, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            outer = getattr(self._local, "statements", None)
+            self._local.statements = []
+            start = time.perf_counter()
+            result = error = None
+            try:
+                result = method(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                statements = self._local.statements
+                self._local.statements = outer
+                if outer is not None:
+                    outer.extend(statements)
+                rows = len(result) if isinstance(result, list) else None
+                self._record(name, elapsed_ms, rows, error, args, statements)
+        return timed
+
+    def _wrap_generator(self, name: str, method):
+        # Generators are timed from the first row to the last (or to the point
+        # the caller stops iterating) - time spent by the caller isn't counted
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            generator = method(*args, **kwargs)
+            statements = []
+            elapsed_ms = 0.0
+            rows = 0
+            error = None
+            try:
+                while True:
+                    outer = getattr(self._local, "statements", None)
+                    self._local.statements = statements
+                    start = time.perf_counter()
+                    try:
+                        row = next(generator)
+                    except StopIteration:
+                        break
+                    finally:
+                        elapsed_ms += (time.perf_counter() - start) * 1000
+                        self._local.statements = outer
+                    rows += 1
+                    yield row
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                generator.close()
+                self._record(name, elapsed_ms, rows, error, args, statements)
+        return timed
+
+    def _record(self, name: str, elapsed_ms: float, rows, error, args, statements):
+        with self._lock:
+            if name not in self.methods:
+                self.methods[name] = MethodStats()
+            self.methods[name].record(elapsed_ms, rows, error)
+        if elapsed_ms >= self.slow_query_ms:
+            self.slow_log.append({
+                "method": name,
+                "ms": elapsed_ms,
+                "rows": rows,
+                "args": [repr(arg)[:80] for arg in args],
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "queries": [{"sql": sql, "plan": self.explain(sql)} for sql in statements
+                            if not sql.upper().startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"))],
+            })
+
+    def explain(self, sql: str):
+        # EXPLAIN QUERY PLAN for one traced statement, one line per plan step
+        # Tracing is paused so the EXPLAIN itself isn't logged
+        outer = getattr(self._local, "statements", None)
+        self._local.statements = None
+        try:
+            rows = self.db.pool.reader().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except Exception as e:
+            return [f"(no plan: {e})"]
+        finally:
+            self._local.statements = outer
+        return [row[3] for row in rows]
+
+    # ============ Reporting ============
+
+    def stats(self):
+        with self._lock:
+            methods = {name: stats.as_dict() for name, stats in sorted(self.methods.items())}
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "methods": methods,
+            "slow_queries": list(self.slow_log),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+            self.slow_log.clear()
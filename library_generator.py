@@ -0,0 +1,90 @@
+import argparse
+import bisect
+import itertools
+import random
+from database import MusicDatabase
+
+# Library generator module - builds synthetic music libraries of any size for
+# benchmarking. Records are produced lazily & loaded w/ MusicDatabase.bulk_import.
+#
+# Shape of a generated library:
+#   - songs are grouped into albums of songs_per_album tracks
+#   - every album has a main artist, each song may add featured artists
+#     (up to artists_per_song in total)
+#   - category popularity follows a power law: category k is picked with
+#     weight 1 / k ** category_skew, so a few categories hold most songs
+#   - album years are spread evenly over year_range
+
+def zipf_weights(count: int, skew: float):
+    # Cumulative weights for random.choices - item k has weight 1 / k ** skew
+    return list(itertools.accumulate(1 / (k ** skew) for k in range(1, count + 1)))
+
+def library_records(songs: int, artists: int = None, categories: int = 50,
+                    songs_per_album: int = 12, artists_per_song: int = 3,
+                    categories_per_song: int = 2, category_skew: float = 1.2,
+                    year_range: tuple = (1950, 2024), seed: int = 0):
+    # Yield bulk import records for a library of the given size
+    rng = random.Random(seed)
+    if artists is None:
+        artists = max(1, songs // 20)
+    category_weights = zipf_weights(categories, category_skew)
+    total_weight = category_weights[-1]
+
+    for song in range(songs):
+        album = song // songs_per_album
+        album_rng = random.Random(seed * 1000003 + album)
+        main_artist = album_rng.randrange(artists)
+        year = album_rng.randint(*year_range)
+
+        # Most songs only have the album's artist - features get rarer
+        song_artists = {main_artist}
+        while len(song_artists) < min(artists_per_song, artists) and rng.random() < 0.3:
+            song_artists.add(rng.randrange(artists))
+
+        song_categories = set()
+        for _ in range(rng.randint(1, categories_per_song)):
+            pick = bisect.bisect(category_weights, rng.random() * total_weight)
+            song_categories.add(min(pick, categories - 1))
+
+        yield {
+            "type": "song",
+            "title": f"Song {song}",
+            "artists": [f"Artist {a}" for a in sorted(song_artists)],
+            "albums": [f"Album {album}"],
+            "categories": [f"Category {c}" for c in sorted(song_categories)],
+            "year": year,
+        }
+
+def generate_library(db: MusicDatabase, songs: int, batch_size: int = 5000, **options):
+    # Fill db w/ a synthetic library - returns the bulk import stats
+    return db.bulk_import(library_records(songs, **options), batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic music library.")
+    parser.add_argument("db", help="Database file to create or extend")
+    parser.add_argument("--songs", type=int, default=10000)
+    parser.add_argument("--artists", type=int, default=None,
+                        help="Distinct artists (default: songs / 20)")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--songs-per-album", type=int, default=12)
+    parser.add_argument("--artists-per-song", type=int, default=3)
+    parser.add_argument("--categories-per-song", type=int, default=2)
+    parser.add_argument("--category-skew", type=float, default=1.2,
+                        help="Power-law exponent for category popularity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = MusicDatabase(args.db, profile="throughput")
+    db.connect()
+    db.initialize_database()
+    stats = generate_library(db, args.songs, artists=args.artists, categories=args.categories,
+                             songs_per_album=args.songs_per_album,
+                             artists_per_song=args.artists_per_song,
+                             categories_per_song=args.categories_per_song,
+                             category_skew=args.category_skew, seed=args.seed)
+    db.close()
+    print(f"Generated {args.songs} songs ({stats['rows']} rows) "
+          f"in {stats['seconds']:.2f}s - {stats['rows_per_sec']:,.0f} rows/sec")
+
+if __name__ == "__main__":
+    main()
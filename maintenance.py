@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import time
+
+# Maintenance module - keeps a MusicDatabase file compact & its query planner
+# statistics current. MusicDatabase exposes each of these as a method:
+#
+#   db.get_page_report()          # page usage, free pages & fragmentation per table
+#   db.analyze()                  # gather planner statistics now
+#   db.optimize()                 # PRAGMA optimize - also run by db.close()
+#   db.incremental_vacuum()       # hand free pages back to the filesystem
+#   db.set_auto_vacuum("INCREMENTAL")
+#   db.vacuum()                   # rebuild the whole file
+#   db.run_maintenance()          # optimize + incremental vacuum when worth it
+#
+# New databases are created w/ auto_vacuum=INCREMENTAL: pages freed by deletes
+# go on a free list that incremental_vacuum returns to the filesystem a few
+# at a time, w/o the full rewrite (& exclusive lock) a VACUUM needs.
+
+AUTO_VACUUM_MODES = ["NONE", "FULL", "INCREMENTAL"]
+
+# Rows ANALYZE samples per index when run w/ a limit (PRAGMA analysis_limit)
+# - enough for good plans, & quick even on multi-million row tables
+ANALYSIS_LIMIT = 1000
+
+# Free pages (as a share of the file) above which run_maintenance vacuums
+VACUUM_THRESHOLD = 0.10
+
+# ==================== Page Usage ======================
+
+def page_report(db):
+    # Page usage of the database file - totals plus, where SQLite was built
+    # w/ the dbstat table, the pages, unused space & fragmentation of every
+    # table & index (fragmentation = share of pages not stored right after
+    # the page before them, i.e. extra seeks for a full scan)
+    cursor = db.pool.reader().cursor()
+    cursor.row_factory = None
+    pragma = lambda name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+    page_size = pragma("page_size")
+    page_count = pragma("page_count")
+    freelist_count = pragma("freelist_count")
+    wal_path = f"{db.db_name}-wal"
+    report = {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "free_percent": 100.0 * freelist_count / page_count if page_count else 0.0,
+        "file_bytes": page_size * page_count,
+        "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        "auto_vacuum": AUTO_VACUUM_MODES[pragma("auto_vacuum")],
+        "objects": None,
+    }
+
+    try:
+        cursor.execute("SELECT name, pageno, pgsize, unused FROM dbstat ORDER BY name, path")
+    except sqlite3.OperationalError:
+        # SQLite built w/o SQLITE_ENABLE_DBSTAT_VTAB - totals only
+        return report
+    objects = {}
+    for name, page_number, size, unused in cursor:
+        stats = objects.get(name)
+        if stats is None:
+            stats = objects[name] = {"name": name, "pages": 0, "bytes": 0, "unused_bytes": 0,
+                                     "out_of_order": 0, "last_page": None}
+        if stats["last_page"] is not None and page_number != stats["last_page"] + 1:
+            stats["out_of_order"] += 1
+        stats["last_page"] = page_number
+        stats["pages"] += 1
+        stats["bytes"] += size
+        stats["unused_bytes"] += unused
+
+    report["objects"] = []
+    for stats in sorted(objects.values(), key=lambda stats: stats["bytes"], reverse=True):
+        pages = stats["pages"]
+        report["objects"].append({
+            "name": stats["name"],
+            "pages": pages,
+            "bytes": stats["bytes"],
+            "unused_percent": 100.0 * stats["unused_bytes"] / stats["bytes"] if stats["bytes"] else 0.0,
+            "fragmentation_percent": 100.0 * stats["out_of_order"] / (pages - 1) if pages > 1 else 0.0,
+        })
+    return report
+
+# ==================== Planner Statistics ======================
+
+def analyze(db, table: str = None, limit: int = None):
+    # Gather planner statistics (sqlite_stat1) for one table or the whole
+    # database - w/ limit, ANALYZE samples about that many rows per index
+    # Other connections pick the new statistics up on their next query
+    start = time.perf_counter()
+    with db.pool.writer() as connection:
+        connection.execute(f"PRAGMA analysis_limit = {int(limit or 0)}")
+        try:
+            connection.execute(f"ANALYZE {table}" if table else "ANALYZE")
+        finally:
+            connection.execute("PRAGMA analysis_limit = 0")
+    return time.perf_counter() - start
+
+def optimize(db, connections: list = None):
+    # Run PRAGMA optimize - SQLite re-analyzes only the tables whose
+    # statistics the connection's recent queries showed to be missing or
+    # stale, so it's cheap enough to run on every close. Defaults to the
+    # writer, which is the connection that makes the data change.
+    if db.read_only:
+        return 0
+    if connections is None:
+        with db.pool.writer() as connection:
+            _optimize_connection(connection)
+        return 1
+    optimized = 0
+    for connection in connections:
+        try:
+            _optimize_connection(connection)
+            optimized += 1
+        except sqlite3.Error:
+            # A connection busy in another thread - skip it, the rest still run
+            pass
+    return optimized
+
+def _optimize_connection(connection: sqlite3.Connection):
+    connection.executescript(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}; PRAGMA optimize;")
+
+# ==================== Vacuuming ======================
+
+def set_auto_vacuum(db, mode: str = "INCREMENTAL"):
+    # Switch auto_vacuum mode - an existing database has to be rebuilt w/
+    # VACUUM for the change to take effect, so this can take a while
+    mode = mode.upper()
+    if mode not in AUTO_VACUUM_MODES:
+        raise ValueError(f"Unknown auto_vacuum mode '{mode}' (expected one of {', '.join(AUTO_VACUUM_MODES)})")
+    with db.pool.writer() as connection:
+        connection.execute(f"PRAGMA auto_vacuum = {mode}")
+        connection.execute("VACUUM")
+        return AUTO_VACUUM_MODES[connection.execute("PRAGMA auto_vacuum").fetchone()[0]]
+
+def incremental_vacuum(db, pages: int = None):
+    # Return up to pages free pages (all of them by default) to the filesystem
+    # Only works in auto_vacuum=INCREMENTAL mode - see set_auto_vacuum
+    with db.pool.writer() as connection:
+        mode = AUTO_VACUUM_MODES[connection.execute("PRAGMA auto_vacuum").fetchone()[0]]
+        if mode != "INCREMENTAL":
+            raise ValueError(f"auto_vacuum is {mode} - incremental vacuum needs INCREMENTAL "
+                             f"(switch w/ set_auto_vacuum)")
+        before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript steps the pragma to completion - execute() would stop
+        # after the first page
+        connection.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)});")
+        after = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
+
+def vacuum(db):
+    # Rebuild the whole file - reclaims every free page & defragments every
+    # table, but needs free disk space for a full copy & blocks writers
+    before = page_report(db)["file_bytes"]
+    with db.pool.writer() as connection:
+        connection.execute("VACUUM")
+    return {"bytes_before": before, "bytes_after": page_report(db)["file_bytes"]}
+
+def run_maintenance(db, vacuum_threshold: float = VACUUM_THRESHOLD):
+    # One scheduled maintenance pass (e.g. nightly, or after a big cleanup):
+    # refresh planner statistics & vacuum free pages once they pass
+    # vacuum_threshold of the file (incremental mode only)
+    start = time.perf_counter()
+    optimize(db)
+    report = page_report(db)
+    freed = 0
+    if report["auto_vacuum"] == "INCREMENTAL" and report["free_percent"] >= vacuum_threshold * 100:
+        freed = incremental_vacuum(db)
+    return {
+        "optimized": True,
+        "free_pages": report["freelist_count"],
+        "freed_pages": freed,
+        "auto_vacuum": report["auto_vacuum"],
+        "seconds": time.perf_counter() - start,
+    }
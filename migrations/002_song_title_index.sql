@@ -0,0 +1,4 @@
+-- Migration 2: index song titles
+
+-- index song titles so songs can be listed page by page in title order
+CREATE INDEX IF NOT EXISTS idx_song_title ON Song(Title);
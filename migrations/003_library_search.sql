@@ -0,0 +1,60 @@
+-- Migration 3: full-text search over every name in the library
+-- rowid encodes the source row: ID * 4 + kind (0 artist, 1 category, 2 album, 3 song)
+-- so the triggers below can update an entry by rowid instead of scanning
+CREATE VIRTUAL TABLE IF NOT EXISTS LibrarySearch USING fts5(
+    Name,
+    prefix = '2 3',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- keep LibrarySearch in sync with the tables it indexes
+CREATE TRIGGER IF NOT EXISTS trg_artist_search_insert AFTER INSERT ON Artist BEGIN
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.ArtistID * 4, NEW.Name);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_artist_search_update AFTER UPDATE OF Name ON Artist BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.ArtistID * 4;
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.ArtistID * 4, NEW.Name);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_artist_search_delete AFTER DELETE ON Artist BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.ArtistID * 4;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_category_search_insert AFTER INSERT ON Category BEGIN
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.CategoryID * 4 + 1, NEW.CategoryName);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_category_search_update AFTER UPDATE OF CategoryName ON Category BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.CategoryID * 4 + 1;
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.CategoryID * 4 + 1, NEW.CategoryName);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_category_search_delete AFTER DELETE ON Category BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.CategoryID * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_album_search_insert AFTER INSERT ON Album BEGIN
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.AlbumID * 4 + 2, NEW.Title);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_search_update AFTER UPDATE OF Title ON Album BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.AlbumID * 4 + 2;
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.AlbumID * 4 + 2, NEW.Title);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_search_delete AFTER DELETE ON Album BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.AlbumID * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_song_search_insert AFTER INSERT ON Song BEGIN
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.SongID * 4 + 3, NEW.Title);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_song_search_update AFTER UPDATE OF Title ON Song BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.SongID * 4 + 3;
+    INSERT INTO LibrarySearch (rowid, Name) VALUES (NEW.SongID * 4 + 3, NEW.Title);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_song_search_delete AFTER DELETE ON Song BEGIN
+    DELETE FROM LibrarySearch WHERE rowid = OLD.SongID * 4 + 3;
+END;
+
+-- index everything already in the library
+DELETE FROM LibrarySearch;
+INSERT INTO LibrarySearch (rowid, Name) SELECT ArtistID * 4, Name FROM Artist;
+INSERT INTO LibrarySearch (rowid, Name) SELECT CategoryID * 4 + 1, CategoryName FROM Category;
+INSERT INTO LibrarySearch (rowid, Name) SELECT AlbumID * 4 + 2, Title FROM Album;
+INSERT INTO LibrarySearch (rowid, Name) SELECT SongID * 4 + 3, Title FROM Song;
@@ -0,0 +1,16 @@
+-- Migration 4: indexes for name/title/year lookups
+
+-- album lookups, updates & deletes by title
+CREATE INDEX IF NOT EXISTS idx_album_title ON Album(Title);
+
+-- albums released in a given year (artists w/ albums in year report)
+CREATE INDEX IF NOT EXISTS idx_album_year ON Album(Year, AlbumID);
+
+-- covering versions of the single-column junction indexes - joins coming
+-- from the artist/album/song side no longer need to visit the table rows
+CREATE INDEX IF NOT EXISTS idx_plays_artist_song ON Plays(ArtistID, SongID);
+CREATE INDEX IF NOT EXISTS idx_ison_album_song ON IsOn(AlbumID, SongID);
+CREATE INDEX IF NOT EXISTS idx_isin_song_category ON IsIn(SongID, CategoryID);
+DROP INDEX IF EXISTS idx_plays_artist;
+DROP INDEX IF EXISTS idx_ison_album;
+DROP INDEX IF EXISTS idx_isin_song;
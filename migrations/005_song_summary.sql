@@ -0,0 +1,96 @@
+-- Migration 5: SongSummary - one pre-joined row per song for song listings
+-- Artists/Albums/Categories hold the linked names, sorted & comma separated
+-- Clustered on (Title, SongID) so listing songs in title order is one scan
+
+CREATE TABLE IF NOT EXISTS SongSummary (
+    Title TEXT NOT NULL,
+    SongID INTEGER NOT NULL,
+    Artists TEXT,
+    Albums TEXT,
+    Categories TEXT,
+    PRIMARY KEY (Title, SongID)
+) WITHOUT ROWID;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_songsummary_song ON SongSummary(SongID);
+
+-- the same summary computed from the live tables - used to build & verify
+CREATE VIEW IF NOT EXISTS SongSummaryLive AS
+SELECT s.Title, s.SongID,
+       (SELECT GROUP_CONCAT(Name) FROM (
+            SELECT DISTINCT a.Name FROM Plays p JOIN Artist a ON p.ArtistID = a.ArtistID
+            WHERE p.SongID = s.SongID ORDER BY a.Name)) AS Artists,
+       (SELECT GROUP_CONCAT(Title) FROM (
+            SELECT DISTINCT al.Title FROM IsOn io JOIN Album al ON io.AlbumID = al.AlbumID
+            WHERE io.SongID = s.SongID ORDER BY al.Title)) AS Albums,
+       (SELECT GROUP_CONCAT(CategoryName) FROM (
+            SELECT DISTINCT c.CategoryName FROM IsIn ii JOIN Category c ON ii.CategoryID = c.CategoryID
+            WHERE ii.SongID = s.SongID ORDER BY c.CategoryName)) AS Categories
+FROM Song s;
+
+-- songs
+CREATE TRIGGER IF NOT EXISTS trg_song_summary_insert AFTER INSERT ON Song BEGIN
+    INSERT INTO SongSummary (Title, SongID) VALUES (NEW.Title, NEW.SongID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_song_summary_update AFTER UPDATE OF Title ON Song BEGIN
+    UPDATE SongSummary SET Title = NEW.Title WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_song_summary_delete AFTER DELETE ON Song BEGIN
+    DELETE FROM SongSummary WHERE SongID = OLD.SongID;
+END;
+
+-- links - recompute the one list that changed for the one song affected
+CREATE TRIGGER IF NOT EXISTS trg_plays_summary_insert AFTER INSERT ON Plays BEGIN
+    UPDATE SongSummary SET Artists = (SELECT Artists FROM SongSummaryLive WHERE SongID = NEW.SongID)
+    WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_plays_summary_delete AFTER DELETE ON Plays BEGIN
+    UPDATE SongSummary SET Artists = (SELECT Artists FROM SongSummaryLive WHERE SongID = OLD.SongID)
+    WHERE SongID = OLD.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_ison_summary_insert AFTER INSERT ON IsOn BEGIN
+    UPDATE SongSummary SET Albums = (SELECT Albums FROM SongSummaryLive WHERE SongID = NEW.SongID)
+    WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_ison_summary_delete AFTER DELETE ON IsOn BEGIN
+    UPDATE SongSummary SET Albums = (SELECT Albums FROM SongSummaryLive WHERE SongID = OLD.SongID)
+    WHERE SongID = OLD.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_isin_summary_insert AFTER INSERT ON IsIn BEGIN
+    UPDATE SongSummary SET Categories = (SELECT Categories FROM SongSummaryLive WHERE SongID = NEW.SongID)
+    WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_isin_summary_delete AFTER DELETE ON IsIn BEGIN
+    UPDATE SongSummary SET Categories = (SELECT Categories FROM SongSummaryLive WHERE SongID = OLD.SongID)
+    WHERE SongID = OLD.SongID;
+END;
+
+-- renames & deletes of linked rows - recompute every song linked to the row
+CREATE TRIGGER IF NOT EXISTS trg_artist_summary_update AFTER UPDATE OF Name ON Artist BEGIN
+    UPDATE SongSummary SET Artists = (SELECT Artists FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM Plays WHERE ArtistID = NEW.ArtistID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_artist_summary_delete AFTER DELETE ON Artist BEGIN
+    UPDATE SongSummary SET Artists = (SELECT Artists FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM Plays WHERE ArtistID = OLD.ArtistID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_summary_update AFTER UPDATE OF Title ON Album BEGIN
+    UPDATE SongSummary SET Albums = (SELECT Albums FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM IsOn WHERE AlbumID = NEW.AlbumID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_summary_delete AFTER DELETE ON Album BEGIN
+    UPDATE SongSummary SET Albums = (SELECT Albums FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM IsOn WHERE AlbumID = OLD.AlbumID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_category_summary_update AFTER UPDATE OF CategoryName ON Category BEGIN
+    UPDATE SongSummary SET Categories = (SELECT Categories FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM IsIn WHERE CategoryID = NEW.CategoryID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_category_summary_delete AFTER DELETE ON Category BEGIN
+    UPDATE SongSummary SET Categories = (SELECT Categories FROM SongSummaryLive l WHERE l.SongID = SongSummary.SongID)
+    WHERE SongID IN (SELECT SongID FROM IsIn WHERE CategoryID = OLD.CategoryID);
+END;
+
+-- summarize the songs already in the library
+DELETE FROM SongSummary;
+INSERT INTO SongSummary (Title, SongID, Artists, Albums, Categories)
+SELECT Title, SongID, Artists, Albums, Categories FROM SongSummaryLive;
@@ -0,0 +1,130 @@
+-- Migration 6: report cubes - precomputed answers for the year & category reports
+-- ArtistYear holds every (album year, artist) pair & CategoryAlbums every
+-- (category, album, artist) triple reachable through the junction tables.
+-- Triggers never recompute a cube themselves - they record which slices (one
+-- year or one category) a change touched in CubeDirty, & the report methods
+-- refresh a dirty slice the next time it's asked for.
+
+CREATE TABLE IF NOT EXISTS ArtistYear (
+    Year INTEGER NOT NULL,
+    Artist TEXT NOT NULL,
+    PRIMARY KEY (Year, Artist)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS CategoryAlbums (
+    CategoryID INTEGER NOT NULL,
+    AlbumTitle TEXT NOT NULL,
+    ArtistName TEXT NOT NULL,
+    PRIMARY KEY (CategoryID, AlbumTitle, ArtistName)
+) WITHOUT ROWID;
+
+-- slices to recompute - Kind is 'year' (Key = Year) or 'category' (Key = CategoryID)
+CREATE TABLE IF NOT EXISTS CubeDirty (
+    Kind TEXT NOT NULL,
+    Key INTEGER NOT NULL,
+    PRIMARY KEY (Kind, Key)
+) WITHOUT ROWID;
+
+-- artist links - the years of the song's albums & the song's categories
+CREATE TRIGGER IF NOT EXISTS trg_plays_cube_insert AFTER INSERT ON Plays BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', al.Year FROM IsOn io JOIN Album al ON al.AlbumID = io.AlbumID WHERE io.SongID = NEW.SongID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', CategoryID FROM IsIn WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_plays_cube_delete AFTER DELETE ON Plays BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', al.Year FROM IsOn io JOIN Album al ON al.AlbumID = io.AlbumID WHERE io.SongID = OLD.SongID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', CategoryID FROM IsIn WHERE SongID = OLD.SongID;
+END;
+
+-- album links - the album's year & the song's categories
+CREATE TRIGGER IF NOT EXISTS trg_ison_cube_insert AFTER INSERT ON IsOn BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', Year FROM Album WHERE AlbumID = NEW.AlbumID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', CategoryID FROM IsIn WHERE SongID = NEW.SongID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_ison_cube_delete AFTER DELETE ON IsOn BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', Year FROM Album WHERE AlbumID = OLD.AlbumID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', CategoryID FROM IsIn WHERE SongID = OLD.SongID;
+END;
+
+-- category links - just that category
+CREATE TRIGGER IF NOT EXISTS trg_isin_cube_insert AFTER INSERT ON IsIn BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key) VALUES ('category', NEW.CategoryID);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_isin_cube_delete AFTER DELETE ON IsIn BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key) VALUES ('category', OLD.CategoryID);
+END;
+
+-- deletes run BEFORE so the links they touch are still there to follow
+CREATE TRIGGER IF NOT EXISTS trg_song_cube_delete BEFORE DELETE ON Song BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', al.Year FROM IsOn io JOIN Album al ON al.AlbumID = io.AlbumID WHERE io.SongID = OLD.SongID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', CategoryID FROM IsIn WHERE SongID = OLD.SongID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_album_cube_year AFTER UPDATE OF Year ON Album
+WHEN OLD.Year IS NOT NEW.Year BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key) VALUES ('year', OLD.Year), ('year', NEW.Year);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_cube_title AFTER UPDATE OF Title ON Album
+WHEN OLD.Title IS NOT NEW.Title BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', ii.CategoryID FROM IsOn io JOIN IsIn ii ON ii.SongID = io.SongID WHERE io.AlbumID = NEW.AlbumID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_album_cube_delete BEFORE DELETE ON Album BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key) VALUES ('year', OLD.Year);
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', ii.CategoryID FROM IsOn io JOIN IsIn ii ON ii.SongID = io.SongID WHERE io.AlbumID = OLD.AlbumID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_artist_cube_update AFTER UPDATE OF Name ON Artist
+WHEN OLD.Name IS NOT NEW.Name BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', al.Year FROM Plays p JOIN IsOn io ON io.SongID = p.SongID
+    JOIN Album al ON al.AlbumID = io.AlbumID WHERE p.ArtistID = NEW.ArtistID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', ii.CategoryID FROM Plays p JOIN IsIn ii ON ii.SongID = p.SongID WHERE p.ArtistID = NEW.ArtistID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_artist_cube_delete BEFORE DELETE ON Artist BEGIN
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'year', al.Year FROM Plays p JOIN IsOn io ON io.SongID = p.SongID
+    JOIN Album al ON al.AlbumID = io.AlbumID WHERE p.ArtistID = OLD.ArtistID;
+    INSERT OR IGNORE INTO CubeDirty (Kind, Key)
+    SELECT 'category', ii.CategoryID FROM Plays p JOIN IsIn ii ON ii.SongID = p.SongID WHERE p.ArtistID = OLD.ArtistID;
+END;
+
+-- a deleted category's slice can never be asked for again - drop it outright
+CREATE TRIGGER IF NOT EXISTS trg_category_cube_delete AFTER DELETE ON Category BEGIN
+    DELETE FROM CategoryAlbums WHERE CategoryID = OLD.CategoryID;
+    DELETE FROM CubeDirty WHERE Kind = 'category' AND Key = OLD.CategoryID;
+END;
+
+-- fill the cubes from the songs already in the library
+DELETE FROM ArtistYear;
+INSERT INTO ArtistYear (Year, Artist)
+SELECT DISTINCT al.Year, a.Name
+FROM Album al
+JOIN IsOn io ON io.AlbumID = al.AlbumID
+JOIN Song s ON s.SongID = io.SongID
+JOIN Plays p ON p.SongID = s.SongID
+JOIN Artist a ON a.ArtistID = p.ArtistID;
+
+DELETE FROM CategoryAlbums;
+INSERT INTO CategoryAlbums (CategoryID, AlbumTitle, ArtistName)
+SELECT DISTINCT ii.CategoryID, al.Title, a.Name
+FROM IsIn ii
+JOIN Category c ON c.CategoryID = ii.CategoryID
+JOIN Song s ON s.SongID = ii.SongID
+JOIN IsOn io ON io.SongID = s.SongID
+JOIN Album al ON al.AlbumID = io.AlbumID
+JOIN Plays p ON p.SongID = s.SongID
+JOIN Artist a ON a.ArtistID = p.ArtistID;
+
+DELETE FROM CubeDirty;
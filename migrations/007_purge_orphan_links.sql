@@ -0,0 +1,17 @@
+-- Migration 7: foreign keys are enforced from now on - drop the junction rows
+-- that deletes made before then left pointing at missing songs, artists,
+-- albums or categories (MusicDatabase.purge_orphan_links does the same)
+-- Every junction column leads an index (the primary keys plus the covering
+-- indexes from migration 4), so cascades & these checks are index lookups
+
+DELETE FROM Plays
+WHERE NOT EXISTS (SELECT 1 FROM Song s WHERE s.SongID = Plays.SongID)
+   OR NOT EXISTS (SELECT 1 FROM Artist a WHERE a.ArtistID = Plays.ArtistID);
+
+DELETE FROM IsOn
+WHERE NOT EXISTS (SELECT 1 FROM Song s WHERE s.SongID = IsOn.SongID)
+   OR NOT EXISTS (SELECT 1 FROM Album al WHERE al.AlbumID = IsOn.AlbumID);
+
+DELETE FROM IsIn
+WHERE NOT EXISTS (SELECT 1 FROM Song s WHERE s.SongID = IsIn.SongID)
+   OR NOT EXISTS (SELECT 1 FROM Category c WHERE c.CategoryID = IsIn.CategoryID);
@@ -0,0 +1,4 @@
+-- Migration 8: the vocabulary of LibrarySearch - one row per distinct word,
+-- read by MusicDatabase.search to correct misspelled words. fts5vocab stores
+-- nothing itself, it reads the FTS5 index, so it never needs updating
+CREATE VIRTUAL TABLE IF NOT EXISTS LibrarySearchTerms USING fts5vocab(LibrarySearch, row);
@@ -1,23 +1,53 @@
-import os
-from database import MusicDatabase
+import argparse
+import csv
+import itertools
+import json
+import shlex
+import sqlite3
+import sys
+import traceback
+from typing import Iterable
+from database import CONNECTION_PROFILES, MusicDatabase
+from export import EXPORT_FORMATS, export_library
+from importer import read_catalog
+from report_runner import run_all_reports
+
+# Output formats for non-interactive commands
+OUTPUT_FORMATS = ["table", "json", "csv"]
+
+# Entity actions that work on many names at once (see command_bulk)
+BULK_ACTIONS = {"delete-many", "rename-many"}
 
 # MusicManager - imports MusicDatabase Module and allows the user
 # to interact with the music database
 class MusicManager:
-    def __init__(self):
-        self.db = MusicDatabase()
+    # status is where start-up messages go - stderr in command mode, so they
+    # never mix w/ a command's (possibly JSON) output on stdout
+    def __init__(self, profile: str = "durable", slow_query_ms: float = None, status=None):
+        self.db = MusicDatabase(profile=profile)
         self.db.connect()
+        # Last error an action raised - shown in the Diagnostics menu
+        self.last_error = None
+        if slow_query_ms is not None:
+            self.db.enable_instrumentation(slow_query_ms)
 
-        # Check if db exists - if not - initialize it
-        if not os.path.exists('music.db') or os.path.getsize('music.db') == 0:
-            print("Initializing Database")
-            self.db.initialize_database()
+        # Create the db on first run & apply any schema migrations it's missing
+        status = status or sys.stdout
+        try:
+            applied = self.db.initialize_database()
+        except FileNotFoundError as e:
+            print(f"Error: {e.filename} not found", file=status)
+        except Exception as e:
+            print(f"Error initializing: {e}", file=status)
+        else:
+            if applied:
+                print(f"Database Initialized (schema version {applied[-1]})", file=status)
 
     # ======== QOL & Input Handling Methods ===========
 
-    # Clear the terminal screen
+    # Clear the terminal screen - an ANSI escape rather than a 'clear' process
     def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        print("\033[2J\033[H", end="", flush=True)
 
     # Get user input safely
     def get_input(self, prompt: str):
@@ -37,32 +67,51 @@ class MusicManager:
             except ValueError:
                 print("Please enter an integer.")
 
-    # Display lists dynamically & allows the user to select a list item
-    # For creating songs & linking them to other entities
-    def selectable_list(self, items: list, display_field: str, id_field: str, item_type: str):
-        if not items:
-            print(f"\nNo {item_type}s available")
-            return None
-        
-        print(f"\nAvailable {item_type}s:")
-        # Unpack tuple & print numbered list of db rows
-        for i, item in enumerate(items, 1):
-            print(f"{i}. {item[display_field]}")
-
-        # Loop until user selects a valid option
+    # Type-ahead picker for creating songs & linking them to other entities
+    # The user types the start of a name & pages through the matches, so only
+    # one page of rows is ever fetched - find is a MusicDatabase.find_* method
+    def pick_item(self, find, name_field: str, id_field: str, item_type: str, page_size: int = 10):
         while True:
-            choice = input(f"\nSelect {item_type} (1-{len(items)} or 0 to skip: )").strip()
-            if choice == '0':
+            prefix = input(f"\nType the start of the {item_type} name "
+                           f"(case-sensitive, Enter for all, 0 to skip): ").strip()
+            if prefix == '0':
                 return None
-            try:
-                # Convert input into an index
-                idx = int(choice) - 1
-                # Ensure selection is valid
-                if 0 <= idx < len(items):
-                    return items[idx][id_field]
-                print(f"Please enter a number between 0 and {len(items)}.")
-            except ValueError:
-                print("Please enter a valid integer.")
+
+            # Stack of page cursors - the top is where the current page starts
+            cursors = [None]
+            while True:
+                items = find(prefix, cursors[-1], page_size)
+                if not items and len(cursors) == 1:
+                    print(f"No {item_type}s start with '{prefix}'.")
+                    break
+
+                print(f"\nMatching {item_type}s (page {len(cursors)}):")
+                for i, item in enumerate(items, 1):
+                    # Albums share titles, so show their year too
+                    year = f" ({item['Year']})" if 'Year' in item.keys() else ""
+                    print(f"{i}. {item[name_field]}{year}")
+
+                has_next = len(items) == page_size
+                options = [f"1-{len(items)} = Select"]
+                if has_next:
+                    options.append("N = Next")
+                if len(cursors) > 1:
+                    options.append("P = Previous")
+                options += ["S = New Search", "0 = Skip"]
+                choice = input(f"\n{', '.join(options)}: ").strip().lower()
+
+                if choice == '0':
+                    return None
+                if choice == 's':
+                    break
+                if choice == 'n' and has_next:
+                    cursors.append((items[-1][name_field], items[-1][id_field]))
+                elif choice == 'p' and len(cursors) > 1:
+                    cursors.pop()
+                elif choice.isdigit() and 1 <= int(choice) <= len(items):
+                    return items[int(choice) - 1][id_field]
+                else:
+                    print("Please enter a valid option.")
 
     # Pause execution & wait for input
     def pause(self):
@@ -425,7 +474,23 @@ class MusicManager:
                 print("\nPlease enter a valid option.")
                 self.pause()
     
+    # Pick any number of items w/ the type-ahead picker - returns the chosen IDs
+    def select_many(self, find, name_field: str, id_field: str, item_type: str, prompt: str):
+        selected = []
+        while True:
+            item_id = self.pick_item(find, name_field, id_field, item_type)
+            if not item_id:
+                break
+            if item_id not in selected:
+                selected.append(item_id)
+            print(f"{item_type} selected!")
+            if input(prompt).strip().lower() != 'y':
+                break
+        return selected
+
     # Create a new song entry & tie it to artist/album/category
+    # Every selection is collected first, then the song & all of its links
+    # are written in a single transaction
     def create_song(self):
         self.clear_screen()
         print("=" * 50)
@@ -435,93 +500,72 @@ class MusicManager:
         title = self.get_input("Song Title:")
 
         try:
-            song_id = self.db.create_song(title)
-            print(f"Song: '{title}' created successfully!")
-
-            # Add artist/artists
+            # Pick artist/artists
             print("\n--- Add Song Artist/Artists ---")
-            artists = self.db.get_all_artists()
-            if artists:
-                while True:
-                    # Get artist IDs
-                    artist_id = self.selectable_list(artists, 'Name', 'ArtistID', 'Artist')
-                    if artist_id:
-                        # Add artist to song
-                        self.db.add_artist_to_song(song_id, artist_id)
-                        print("Artist added!")
-
-                        additional_artist = input("Add another artist? (Y/N):").strip().lower()
-                        if additional_artist != 'y':
-                            break
-                    else:
-                        break
-            else:
-                print("No artists in library. Add artists first!")
-            
-            # Add song to an album/albums
+            artist_ids = self.select_many(self.db.find_artists, 'Name', 'ArtistID', 'Artist',
+                                          "Add another artist? (Y/N):")
+
+            # Pick album/albums
             print("\n--- Add Song to Album/Albums ---")
-            albums = self.db.get_all_albums()
-            if albums:
-                while True:
-                    # Get album IDs
-                    album_id = self.selectable_list(albums, 'Title', 'AlbumID', 'Album')
-                    if album_id:
-                        self.db.add_song_to_album(song_id, album_id)
-                        print("Added to album!")
-
-                        additional_album = input("Add song to another album? (Y/N):").strip().lower()
-                        if additional_album != 'y':
-                            break
-                    else:
-                        break
-            else:
-                print("No albums in library. Add albums first!")
-            
-            # Add song to category
+            album_ids = self.select_many(self.db.find_albums, 'Title', 'AlbumID', 'Album',
+                                         "Add song to another album? (Y/N):")
+
+            # Pick category/categories
             print("\n--- Add Category/Categories to Song ---")
-            categories = self.db.get_all_categories()
-            if categories:
-                while True:
-                    category_id = self.selectable_list(categories, 'CategoryName', 'CategoryID', 'Category')
-                    if category_id:
-                        self.db.add_category_to_song(song_id, category_id)
-                        print("Category added!")
-
-                        additional_category = input("Add additional categories to song? (Y/N):").strip().lower()
-                        if additional_category != 'y':
-                            break
-                    else:
-                        break
-            else:
-                print("No categories in library. Add categories first!")
+            category_ids = self.select_many(self.db.find_categories, 'CategoryName', 'CategoryID', 'Category',
+                                            "Add additional categories to song? (Y/N):")
+
+            self.db.create_song_with_links(title, artist_ids, album_ids, category_ids)
             print("\n")
             print("=" * 50)
             print(f"{title} fully created!")
             print("=" * 50)
 
         except Exception as e:
-            print("Error creating song: {e}")
+            print(f"Error creating song: {e}")
         self.pause()
     
     # Display all songs and pull their respective artist, album, and category
-    def display_all_songs(self):
-        self.clear_screen()
-        print("=" * 50)
-        print("All Songs")
-        print("=" * 50)
+    # Songs are shown one page at a time so large libraries open instantly
+    def display_all_songs(self, page_size: int = 20):
+        # Stack of page cursors - the top is where the current page starts
+        cursors = [None]
 
-        songs = self.db.get_all_songs()
+        while True:
+            self.clear_screen()
+            print("=" * 50)
+            print(f"All Songs - Page {len(cursors)}")
+            print("=" * 50)
+
+            songs = self.db.get_songs_page(cursors[-1], page_size)
+
+            if not songs and len(cursors) == 1:
+                print("No songs in your library.")
+                self.pause()
+                return
 
-        if not songs:
-            print("No songs in your library.")
-        else:
             for song in songs:
                 print(f"Title: {song['Title']}")
                 print(f"Artist: {song['Artists'] if song['Artists'] else 'None'}")
                 print(f"Album: {song['Albums'] if song['Albums'] else 'None'}")
                 print(f"Category: {song['Categories'] if song['Categories'] else 'None'}")
                 print("-" * 50)
-        self.pause()
+
+            has_next = len(songs) == page_size
+            options = []
+            if has_next:
+                options.append("N = Next")
+            if len(cursors) > 1:
+                options.append("P = Previous")
+            options.append("Q = Back")
+            choice = input(f"\n{', '.join(options)}: ").strip().lower()
+
+            if choice == 'n' and has_next:
+                cursors.append((songs[-1]['Title'], songs[-1]['SongID']))
+            elif choice == 'p' and len(cursors) > 1:
+                cursors.pop()
+            elif choice == 'q':
+                return
 
     # Update a song's title
     def update_song(self):
@@ -568,7 +612,8 @@ class MusicManager:
             print("1. See all songs played by an artist.")
             print("2. Look up all artists with albums in a given year.")
             print("3. Find all albums with songs in a given category.")
-            print("4. Back to Main Menu")
+            print("4. See an artist's discography.")
+            print("5. Back to Main Menu")
 
             choice = self.get_input("\nChoose an option:")
 
@@ -579,11 +624,25 @@ class MusicManager:
             elif choice == '3':
                 self.see_all_albums_in_category()
             elif choice == '4':
+                self.see_artist_discography()
+            elif choice == '5':
                 break
             else:
                 print("\nPlease enter a valid option.")
                 self.pause()
 
+    # Print report rows as they're streamed from the database
+    # Returns the number of rows printed
+    def print_report(self, rows, line):
+        count = 0
+        for row in rows:
+            if count == 0:
+                print("-" * 50)
+            print(line(row))
+            print("-" * 50)
+            count += 1
+        return count
+
     # Show all songs played by an artist
     def see_all_songs_played_by_artist(self):
         self.clear_screen()
@@ -592,15 +651,10 @@ class MusicManager:
         print("=" * 50)
 
         artist_name = self.get_input("Enter the name of the artist:")
-        songs = self.db.see_all_songs_played_by_artist(artist_name)
+        songs = self.db.stream_songs_played_by_artist(artist_name)
 
-        if not songs:
+        if not self.print_report(songs, lambda song: f"{song['Title']} by {song['ArtistName']}"):
             print("No songs for given artist.")
-        else:
-            print("-" * 50)
-            for song in songs:
-                print(f"{song['Title']} by {song['ArtistName']}")
-                print("-" * 50)
         self.pause()
 
     # Show all artists with albums in a given year
@@ -611,15 +665,10 @@ class MusicManager:
         print("=" * 50)
 
         year = self.get_input("Enter the year you'd like to see artists w/ albums from:")
-        artists = self.db.see_all_artists_with_albums_in_year(year)
+        artists = self.db.stream_artists_with_albums_in_year(year)
 
-        if not artists:
+        if not self.print_report(artists, lambda artist: f"Artist: {artist['Artist']}"):
             print("No artists w/ albums in the given year.")
-        else:
-            print("-" * 50)
-            for artist in artists:
-                print(f"Artist: {artist['Artist']}")
-                print("-" * 50)
         self.pause()
         
     # Show all albums w/ songs in given category
@@ -630,18 +679,272 @@ class MusicManager:
         print("=" * 50)
 
         category = self.get_input("Enter your desired category:")
-        albums = self.db.see_all_albums_in_category(category)
+        albums = self.db.stream_albums_in_category(category)
 
-        if not category:
+        if not self.print_report(albums, lambda album: f"{album['AlbumTitle']} by {album['ArtistName']}"):
             print("No albums with songs in that category.")
+        self.pause()
+
+    # Show every song by an artist grouped by album, w/ years & categories
+    def see_artist_discography(self):
+        self.clear_screen()
+        print("=" * 50)
+        print("See An Artist's Discography")
+        print("=" * 50)
+
+        artist_name = self.get_input("Enter the name of the artist:")
+        discography = self.db.get_artist_discography(artist_name)
+
+        if discography is None:
+            print("Artist not found.")
+        elif not discography["albums"]:
+            print("No songs for given artist.")
         else:
-            print("-" * 50)
-            for album in albums:
-                print(f"{album['AlbumTitle']} by {album['ArtistName']}")
+            print(f"{discography['artist']} - {discography['songs']} songs")
+            for album in discography["albums"]:
                 print("-" * 50)
+                if album["album_id"] is None:
+                    print("Not on an album")
+                else:
+                    print(f"{album['year']} - {album['title']}")
+                if album["categories"]:
+                    print(f"  Categories: {', '.join(album['categories'])}")
+                for song in album["songs"]:
+                    categories = f" ({', '.join(song['categories'])})" if song["categories"] else ""
+                    print(f"    {song['title']}{categories}")
+            print("-" * 50)
         self.pause()
         
 
+    # ===================== Library Search ======================
+
+    # Search every artist, category, album & song name in the library
+    def display_search_menu(self):
+        while True:
+            self.clear_screen()
+            print("=" * 50)
+            print("Search Library")
+            print("=" * 50)
+            print("1. Search")
+            print("2. Rebuild Search Index")
+            print("3. Back to Main Menu")
+
+            choice = self.get_input("\nChoose an option:")
+
+            if choice == '1':
+                self.search_library()
+            elif choice == '2':
+                self.rebuild_search_index()
+            elif choice == '3':
+                break
+            else:
+                print("\nPlease enter a valid option.")
+                self.pause()
+
+    # Show ranked matches for a search - words may be partial, e.g. 'boh rhap'
+    def search_library(self):
+        self.clear_screen()
+        print("=" * 50)
+        print("Search Library")
+        print("=" * 50)
+
+        query = self.get_input("Search for:")
+
+        try:
+            results = self.db.search(query)
+        except Exception as e:
+            print(f"\nError searching library: {e}")
+            self.pause()
+            return
+
+        if not results:
+            print("No matches found.")
+        else:
+            print("-" * 50)
+            for result in results:
+                print(f"{result['Kind']}: {result['Name']}")
+                print("-" * 50)
+        self.pause()
+
+    # Rebuild the search index - only needed for libraries created before search
+    def rebuild_search_index(self):
+        try:
+            self.db.rebuild_search_index()
+            print("\nSearch index rebuilt.")
+        except Exception as e:
+            print(f"\nError rebuilding search index: {e}")
+        self.pause()
+
+
+    # ===================== Diagnostics =========================
+
+    # Hidden menu ('d' from the main menu) for timing database calls
+    def display_diagnostics_menu(self):
+        while True:
+            self.clear_screen()
+            print("=" * 50)
+            print("Diagnostics")
+            print("=" * 50)
+            state = "ON" if self.db.instrumentation else "OFF"
+            print(f"Instrumentation: {state}")
+            print("1. Enable/Disable Instrumentation")
+            print("2. Method Latencies")
+            print("3. Slow Query Log")
+            print("4. Cache & Connection Settings")
+            print("5. Reset Stats")
+            print("6. Database Maintenance")
+            print("7. Back to Main Menu")
+
+            choice = self.get_input("\nChoose an option:")
+
+            if choice == '1':
+                self.toggle_instrumentation()
+            elif choice == '2':
+                self.display_method_latencies()
+            elif choice == '3':
+                self.display_slow_queries()
+            elif choice == '4':
+                self.display_cache_and_pragmas()
+            elif choice == '5':
+                self.db.reset_stats()
+                print("\nStats reset.")
+                self.pause()
+            elif choice == '6':
+                self.maintenance_menu()
+            elif choice == '7':
+                break
+            else:
+                print("\nPlease enter a valid option.")
+                self.pause()
+
+    # Turn instrumentation on (asking for the slow query threshold) or off
+    def toggle_instrumentation(self):
+        if self.db.instrumentation:
+            self.db.disable_instrumentation()
+            print("\nInstrumentation disabled.")
+        else:
+            threshold = input("Log calls slower than how many ms? (default 100): ").strip()
+            try:
+                slow_query_ms = float(threshold) if threshold else 100.0
+            except ValueError:
+                print("Please enter a number.")
+                self.pause()
+                return
+            self.db.enable_instrumentation(slow_query_ms)
+            print(f"\nInstrumentation enabled - logging calls over {slow_query_ms:g} ms.")
+        self.pause()
+
+    # Table of calls, rows & latency percentiles per database method
+    def display_method_latencies(self):
+        self.clear_screen()
+        print("=" * 50)
+        print("Method Latencies")
+        print("=" * 50)
+
+        stats = self.db.get_stats()
+        if stats is None:
+            print("Instrumentation is off.")
+        elif not stats['methods']:
+            print("No calls recorded yet.")
+        else:
+            print(f"{'method':<36} {'calls':>6} {'rows':>8} {'mean ms':>9} "
+                  f"{'p50':>7} {'p95':>7} {'p99':>7} {'max ms':>9} {'errors':>6}")
+            for name, method in stats['methods'].items():
+                print(f"{name:<36} {method['calls']:>6} {method['rows']:>8} "
+                      f"{method['mean_ms']:>9.3f} {method['p50_ms']:>7g} {method['p95_ms']:>7g} "
+                      f"{method['p99_ms']:>7g} {method['max_ms']:>9.3f} {method['errors']:>6}")
+        if self.last_error:
+            print(f"\nLast error:\n{self.last_error}")
+        self.pause()
+
+    # Slow calls w/ the SQL they ran & how SQLite planned it
+    def display_slow_queries(self):
+        self.clear_screen()
+        print("=" * 50)
+        print("Slow Query Log")
+        print("=" * 50)
+
+        stats = self.db.get_stats()
+        if stats is None:
+            print("Instrumentation is off.")
+        elif not stats['slow_queries']:
+            print(f"No calls slower than {stats['slow_query_ms']:g} ms.")
+        else:
+            for entry in stats['slow_queries']:
+                print(f"{entry['at']}  {entry['method']}({', '.join(entry['args'])}) "
+                      f"{entry['ms']:.1f} ms, {entry['rows'] if entry['rows'] is not None else '-'} rows")
+                for query in entry['queries']:
+                    print(f"  SQL: {' '.join(query['sql'].split())[:200]}")
+                    for step in query['plan']:
+                        print(f"    {step}")
+                print("-" * 50)
+        self.pause()
+
+    # Name cache hit rates & the PRAGMAs in effect
+    def display_cache_and_pragmas(self):
+        self.clear_screen()
+        print("=" * 50)
+        print("Cache & Connection Settings")
+        print("=" * 50)
+
+        for kind, cache in self.db.get_cache_stats().items():
+            print(f"{kind} cache: {cache}")
+        print("-" * 50)
+        self.show_pragmas()
+        self.pause()
+
+
+    # Page usage & the VACUUM / ANALYZE / optimize actions
+    def maintenance_menu(self):
+        while True:
+            self.clear_screen()
+            print("=" * 50)
+            print("Database Maintenance")
+            print("=" * 50)
+            self.print_page_report(self.db.get_page_report())
+            print("-" * 50)
+            print("1. Run Maintenance (optimize & reclaim free pages)")
+            print("2. Analyze (refresh query planner statistics)")
+            print("3. Incremental Vacuum")
+            print("4. Switch to Incremental Auto-Vacuum (rebuilds the file)")
+            print("5. Full Vacuum (rebuilds the file)")
+            print("6. Back to Diagnostics")
+
+            choice = self.get_input("\nChoose an option:")
+
+            try:
+                if choice == '1':
+                    result = self.db.run_maintenance()
+                    print(f"\nOptimized & freed {result['freed_pages']} pages in {result['seconds']:.2f}s.")
+                elif choice == '2':
+                    print(f"\nAnalyzed in {self.db.analyze():.2f}s.")
+                elif choice == '3':
+                    print(f"\nFreed {self.db.incremental_vacuum()} pages.")
+                elif choice == '4':
+                    print(f"\nauto_vacuum is now {self.db.set_auto_vacuum('INCREMENTAL')}.")
+                elif choice == '5':
+                    result = self.db.vacuum()
+                    print(f"\nFile went from {result['bytes_before']:,} to {result['bytes_after']:,} bytes.")
+                elif choice == '6':
+                    break
+                else:
+                    print("\nPlease enter a valid option.")
+            except ValueError as e:
+                print(f"\n{e}")
+            self.pause()
+
+    # File size, free pages & the largest tables/indexes
+    def print_page_report(self, report: dict, limit: int = 8):
+        print(f"File: {report['file_bytes']:,} bytes ({report['page_count']:,} pages of "
+              f"{report['page_size']:,}), WAL: {report['wal_bytes']:,} bytes")
+        print(f"Free pages: {report['freelist_count']:,} ({report['free_percent']:.1f}%), "
+              f"auto_vacuum: {report['auto_vacuum']}")
+        if report['objects']:
+            print(f"\n{'table/index':<32} {'pages':>8} {'unused %':>9} {'fragmented %':>13}")
+            for stats in report['objects'][:limit]:
+                print(f"{stats['name']:<32} {stats['pages']:>8,} {stats['unused_percent']:>9.1f} "
+                      f"{stats['fragmentation_percent']:>13.1f}")
+
     # ===================== Main Menu ===========================
 
 
@@ -658,42 +961,567 @@ class MusicManager:
             print("3. Manage Albums")
             print("4. Manage Songs")
             print("5. Generate Reports")
-            print("6. Quit")
+            print("6. Search Library")
+            print("7. Quit")
 
             choice = self.get_input("\nChoose an option:")
-
-            if choice == '0':
-                self.display_instructions()
-            if choice == '1':
-                self.display_artist_menu()
-            elif choice == '2':
-                self.display_category_menu()
-            elif choice == '3':
-                self.display_album_menu()
-            elif choice == '4':
-                self.display_song_menu()
-            elif choice == '5':
-                self.display_report_menu()
-            elif choice == '6':
+            if choice == '7':
                 break
-            else:
-                print("Please enter a valid option.")
+
+            # An error in one action is reported & the session carries on
+            try:
+                if choice == '0':
+                    self.display_instructions()
+                elif choice == '1':
+                    self.display_artist_menu()
+                elif choice == '2':
+                    self.display_category_menu()
+                elif choice == '3':
+                    self.display_album_menu()
+                elif choice == '4':
+                    self.display_song_menu()
+                elif choice == '5':
+                    self.display_report_menu()
+                elif choice == '6':
+                    self.display_search_menu()
+                elif choice.lower() == 'd':
+                    self.display_diagnostics_menu()
+                else:
+                    print("Please enter a valid option.")
+                    self.pause()
+            except EOFError:
+                # Input has ended - nothing left to carry on with
+                raise
+            except Exception as e:
+                self.report_error(e)
                 self.pause()
+
+    # Record an error for the Diagnostics menu & show it
+    def report_error(self, error: Exception):
+        self.last_error = traceback.format_exc()
+        print(f"\nError: {error}")
+        # Full traceback while diagnosing - otherwise just the message
+        if self.db.instrumentation:
+            traceback.print_exc()
                 
 
+    # ================= Non-Interactive Commands ================
+    # Each command handler takes the parsed arguments & returns a list of
+    # rows (dicts) for write_rows - problems are raised as CommandError
+
+    # Run one parsed command & print its rows - returns True on success
+    def run_command(self, args, fmt: str = "table", out=None):
+        out = out or sys.stdout
+        try:
+            # Streamed rows are read while they're written, so errors can
+            # surface in either step
+            write_rows(args.handler(self, args), fmt, out)
+        except (CommandError, sqlite3.Error, OSError, ValueError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return False
+        return True
+
+    # Run many commands (one per line, same syntax as the command line) in
+    # this process - blank lines & lines starting w/ '#' are skipped
+    def run_batch(self, lines: Iterable[str], parser: argparse.ArgumentParser,
+                  fmt: str = "table", stop_on_error: bool = False):
+        failures = 0
+        for number, line in enumerate(lines, 1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            try:
+                args = parser.parse_args(words)
+            except SystemExit:
+                # argparse has already printed the usage error
+                args = None
+            if args is not None and args.command in (None, "batch"):
+                print(f"error: line {number}: expected a command", file=sys.stderr)
+                args = None
+            ok = args is not None and self.run_command(args, args.format or fmt)
+            if not ok:
+                failures += 1
+                print(f"error: line {number} failed: {line.strip()}", file=sys.stderr)
+                if stop_on_error:
+                    break
+            sys.stdout.flush()
+        return failures == 0
+
+    # Look up a row by name or raise CommandError
+    def require(self, row, kind: str, name: str):
+        if row is None:
+            raise CommandError(f"{kind} '{name}' not found")
+        return row
+
+    # Resolve artist, album & category names to IDs
+    def link_ids(self, artists: list, albums: list, categories: list):
+        return (
+            [self.require(self.db.get_artist_by_name(name), "artist", name)['ArtistID'] for name in artists],
+            [self.require(self.db.get_album_by_name(title), "album", title)['AlbumID'] for title in albums],
+            [self.require(self.db.get_category_by_name(name), "category", name)['CategoryID']
+             for name in categories],
+        )
+
+    def command_artist(self, args):
+        if args.action in BULK_ACTIONS:
+            return self.command_bulk(args)
+        if args.action == "add":
+            return [{"ArtistID": self.db.create_artist(args.name), "Name": args.name}]
+        if args.action == "list":
+            return self.db.get_all_artists()
+        if args.action == "rename":
+            if not self.db.update_artist_by_name(args.old_name, args.new_name):
+                raise CommandError(f"artist '{args.old_name}' not found")
+            return [{"Renamed": args.old_name, "Name": args.new_name}]
+        if not self.db.delete_artist_by_name(args.name):
+            raise CommandError(f"artist '{args.name}' not found")
+        return [{"Deleted": args.name}]
+
+    def command_category(self, args):
+        if args.action in BULK_ACTIONS:
+            return self.command_bulk(args)
+        if args.action == "add":
+            return [{"CategoryID": self.db.create_category(args.name), "CategoryName": args.name}]
+        if args.action == "list":
+            return self.db.get_all_categories()
+        if args.action == "rename":
+            if not self.db.update_category_by_name(args.old_name, args.new_name):
+                raise CommandError(f"category '{args.old_name}' not found")
+            return [{"Renamed": args.old_name, "CategoryName": args.new_name}]
+        if not self.db.delete_category_by_name(args.name):
+            raise CommandError(f"category '{args.name}' not found")
+        return [{"Deleted": args.name}]
+
+    def command_album(self, args):
+        if args.action in BULK_ACTIONS:
+            return self.command_bulk(args)
+        if args.action == "add":
+            return [{"AlbumID": self.db.create_album(args.title, args.year),
+                     "Title": args.title, "Year": args.year}]
+        if args.action == "list":
+            return self.db.get_all_albums()
+        if args.action == "rename":
+            # Keep the album's year unless a new one is given
+            year = args.year
+            if year is None:
+                year = self.require(self.db.get_album_by_name(args.old_title), "album", args.old_title)['Year']
+            if not self.db.update_album_by_name(args.old_title, args.new_title, year):
+                raise CommandError(f"album '{args.old_title}' not found")
+            return [{"Renamed": args.old_title, "Title": args.new_title, "Year": year}]
+        if not self.db.delete_album_by_name(args.title):
+            raise CommandError(f"album '{args.title}' not found")
+        return [{"Deleted": args.title}]
+
+    def command_song(self, args):
+        if args.action in BULK_ACTIONS:
+            return self.command_bulk(args)
+        if args.action == "add":
+            links = self.link_ids(args.artist, args.album, args.category)
+            song_id = self.db.create_song_with_links(args.title, *links)
+            return [{"SongID": song_id, "Title": args.title}]
+        if args.action == "list":
+            return list(itertools.islice(self.db.iter_songs(), args.limit))
+        if args.action == "link":
+            song = self.require(self.db.get_song_by_name(args.title), "song", args.title)
+            self.db.add_links_to_song(song['SongID'], *self.link_ids(args.artist, args.album, args.category))
+            return [{"SongID": song['SongID'], "Title": args.title,
+                     "Linked": len(args.artist) + len(args.album) + len(args.category)}]
+        if args.action == "rename":
+            if not self.db.update_song_by_name(args.old_title, args.new_title):
+                raise CommandError(f"song '{args.old_title}' not found")
+            return [{"Renamed": args.old_title, "Title": args.new_title}]
+        if not self.db.delete_song_by_name(args.title):
+            raise CommandError(f"song '{args.title}' not found")
+        return [{"Deleted": args.title}]
+
+    # delete-many & rename-many for any entity - one transaction per command
+    def command_bulk(self, args):
+        if args.action == "rename-many":
+            with open_input(args.file) as f:
+                pairs = [row for row in csv.reader(f) if row]
+            bad = [row for row in pairs if len(row) != 2]
+            if bad:
+                raise CommandError(f"expected old,new pairs - got {','.join(bad[0])}")
+            outcomes = self.db.rename_many(args.kind, pairs)
+            renames = dict(pairs)
+            return [{"Old": old, "New": renames[old], "Outcome": outcome} for old, outcome in outcomes.items()]
+
+        if args.like is not None:
+            if args.names or args.file:
+                raise CommandError("give names or --like, not both")
+            name_column = self.db.BULK_TABLES[args.kind][2]
+            outcomes = self.db.delete_many(args.kind, where=f"{name_column} LIKE ?", params=(args.like,))
+        else:
+            names = list(args.names)
+            if args.file:
+                with open_input(args.file) as f:
+                    names += [line.strip() for line in f if line.strip()]
+            if not names:
+                raise CommandError("no names given")
+            outcomes = self.db.delete_many(args.kind, names)
+        return [{"Name": name, "Deleted": count} for name, count in outcomes.items()]
+
+    def command_report(self, args):
+        # Reports are streamed - rows print as they're read. Stale reads need
+        # the fresh flag, so they're answered in one go instead.
+        if args.report == "all":
+            return self.command_report_all(args)
+        if args.report == "by-artist":
+            return self.db.stream_songs_played_by_artist(args.name, args.arraysize)
+        if args.report == "discography":
+            return discography_rows(self.db.get_artist_discography(args.name))
+        if not args.allow_stale:
+            if args.report == "by-year":
+                return self.db.stream_artists_with_albums_in_year(args.year, args.arraysize)
+            return self.db.stream_albums_in_category(args.name, args.arraysize)
+
+        if args.report == "by-year":
+            rows = self.db.see_all_artists_with_albums_in_year(args.year, allow_stale=True)
+        else:
+            rows = self.db.see_all_albums_in_category(args.name, allow_stale=True)
+        if not rows.fresh:
+            print("note: report cube is awaiting a refresh - results may be out of date", file=sys.stderr)
+        return rows
+
+    # Run every year & category report across worker processes
+    def command_report_all(self, args):
+        results = run_all_reports(self.db, args.workers, not args.no_compare, args.refresh_cubes)
+        summary = (f"Ran {results['tasks']} reports on {results['workers']} workers "
+                   f"in {results['parallel_seconds']:.2f}s")
+        if results['serial_seconds'] is not None:
+            summary += (f" (serial {results['serial_seconds']:.2f}s, speedup {results['speedup']:.1f}x"
+                        f"{'' if results['matches'] else ', RESULTS DIFFER'})")
+        print(f"{summary} - {len(results['artists'])} distinct artists, "
+              f"{len(results['albums'])} distinct album/artist pairs", file=sys.stderr)
+        return [{"Report": f"by-{kind}", "Key": key, "Rows": len(rows)}
+                for (kind, key), rows in results['reports'].items()]
+
+    # Report cube status, optionally refreshing dirty slices or rebuilding
+    def command_cubes(self, args):
+        if args.rebuild:
+            self.db.rebuild_report_cubes()
+        elif args.refresh:
+            self.db.refresh_report_cubes()
+        return [{"Cube": kind, "Rows": status['rows'], "DirtySlices": status['dirty']}
+                for kind, status in self.db.get_cube_status().items()]
+
+    def command_search(self, args):
+        return self.db.search(args.query, args.limit)
+
+    # Bulk import a .jsonl record file or a .csv/.jsonl catalog of song rows
+    def command_import(self, args):
+        try:
+            records = read_catalog(args.file, args.separator)
+            stats = self.db.bulk_import(records, args.batch_size, args.cache_size)
+        except Exception as e:
+            raise CommandError(f"import failed, no rows were written: {e}")
+
+        print(f"Imported {stats['records']} records ({stats['rows']} rows) "
+              f"in {stats['seconds']:.2f}s - {stats['rows_per_sec']:,.0f} rows/sec", file=sys.stderr)
+        return [{"Table": table, "Rows": count} for table, count in stats['counts'].items()]
+
+    # Export every song & its links to a .csv, .jsonl or .mcol file
+    def command_export(self, args):
+        try:
+            stats = export_library(self.db, args.file, args.file_format, args.chunk_size, args.separator)
+        except (ValueError, OSError) as e:
+            raise CommandError(f"export failed: {e}")
+
+        print(f"Exported {stats['songs']} songs to {args.file} in {stats['seconds']:.2f}s - "
+              f"{stats['songs_per_sec']:,.0f} songs/sec", file=sys.stderr)
+        return [{"Format": stats['format'], "Songs": stats['songs'], "Bytes": stats['bytes']}]
+
+    # Check SongSummary against the live tables, optionally rebuilding it
+    def command_song_summary(self, args):
+        rebuilt = self.db.rebuild_song_summary() if args.rebuild else None
+        stale = self.db.verify_song_summary()
+        if stale:
+            raise CommandError(f"song summary is out of date for {len(stale)} songs "
+                               f"(first IDs: {', '.join(map(str, stale[:10]))}) - "
+                               f"run 'song-summary --rebuild' to fix it")
+        return [{"Status": "ok", "Rebuilt": rebuilt}]
+
+    # Page usage report, after any maintenance actions asked for
+    def command_maintenance(self, args):
+        try:
+            if args.auto_vacuum:
+                print(f"auto_vacuum is now {self.db.set_auto_vacuum(args.auto_vacuum)}", file=sys.stderr)
+            if args.vacuum:
+                result = self.db.vacuum()
+                print(f"Vacuumed: {result['bytes_before']:,} -> {result['bytes_after']:,} bytes", file=sys.stderr)
+            if args.analyze:
+                print(f"Analyzed in {self.db.analyze():.2f}s", file=sys.stderr)
+            if args.incremental_vacuum:
+                print(f"Freed {self.db.incremental_vacuum()} pages", file=sys.stderr)
+            if args.run:
+                result = self.db.run_maintenance()
+                print(f"Optimized & freed {result['freed_pages']} pages in {result['seconds']:.2f}s",
+                      file=sys.stderr)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        report = self.db.get_page_report()
+        print(f"{report['file_bytes']:,} bytes, {report['freelist_count']:,} free pages "
+              f"({report['free_percent']:.1f}%), auto_vacuum {report['auto_vacuum']}", file=sys.stderr)
+        return [{"Name": stats['name'], "Pages": stats['pages'], "Bytes": stats['bytes'],
+                 "UnusedPercent": round(stats['unused_percent'], 1),
+                 "FragmentedPercent": round(stats['fragmentation_percent'], 1)}
+                for stats in report['objects'] or []]
+
+    # Count orphaned junction rows, optionally deleting them
+    def command_orphans(self, args):
+        orphans = self.db.find_orphan_links()
+        purged = self.db.purge_orphan_links() if args.purge else {}
+        return [{"Table": table, "Orphans": count, "Purged": purged.get(table, 0)}
+                for table, count in orphans.items()]
+
+    # The connection profile & the PRAGMA values in effect
+    def command_pragmas(self, args):
+        return [{"Pragma": pragma, "Value": value}
+                for pragma, value in self.db.get_active_pragmas().items()]
+
+    # Print the connection profile & the PRAGMA values in effect
+    def show_pragmas(self):
+        for pragma, value in self.db.get_active_pragmas().items():
+            print(f"{pragma}: {value}")
+        return True
+
+
     # ======= Class Instantiation & Application Entry Point =======
 
     # Start the application
     def run(self):
+        # Closing runs PRAGMA optimize (see MusicDatabase.close), so it
+        # happens on Quit as well as when input ends or an error escapes
         try:
             self.main_menu()
+        except EOFError:
+            pass
         except Exception as e:
-            print(f"\nError: {e}")
+            self.report_error(e)
+        finally:
             self.db.close()
 
+# Raised by command handlers for a failed command
+class CommandError(Exception):
+    pass
+
+# Rows read before a table's column widths are fixed - later rows that don't
+# fit simply push their line wider
+TABLE_SAMPLE_ROWS = 100
+
+# Print command rows as an aligned table, one JSON array per command or CSV
+# rows may be any iterable (e.g. a stream_* generator) - rows are written as
+# they arrive rather than after the whole result has been read
+def write_rows(rows, fmt: str = "table", out=None):
+    out = out or sys.stdout
+    rows = iter(rows or [])
+    if fmt == "json":
+        out.write("[")
+        for i, row in enumerate(rows):
+            out.write((", " if i else "") + json.dumps(dict(row), default=str))
+        out.write("]\n")
+        return
+
+    # The first rows size the table (& give the CSV header)
+    sample = [dict(row) for row in itertools.islice(rows, TABLE_SAMPLE_ROWS)]
+    if not sample:
+        if fmt == "table":
+            out.write("No rows.\n")
+        return
+    columns = list(sample[0].keys())
+    if fmt == "csv":
+        writer = csv.DictWriter(out, columns, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(sample)
+        writer.writerows(dict(row) for row in rows)
+        return
+
+    def cells(row):
+        return ["" if row.get(column) is None else str(row.get(column)) for column in columns]
+
+    widths = [max(len(column), *(len(line[i]) for line in map(cells, sample)))
+              for i, column in enumerate(columns)]
+
+    def write_line(line):
+        out.write("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() + "\n")
+
+    write_line(columns)
+    out.write("  ".join("-" * width for width in widths) + "\n")
+    for row in sample:
+        write_line(cells(row))
+    out.flush()
+    for row in rows:
+        write_line(cells(dict(row)))
+
+# One row per song & album of an artist's discography, for write_rows
+def discography_rows(discography: dict):
+    if discography is None:
+        return []
+    return [{"Year": album["year"], "Album": album["title"], "Song": song["title"],
+             "Categories": ", ".join(song["categories"])}
+            for album in discography["albums"] for song in album["songs"]]
+
+# Subcommands for one entity type: add, list, rename & delete
+def add_entity_parser(subparsers, kind: str, name_field: str, handler):
+    entity_parser = subparsers.add_parser(kind, help=f"Add, list, rename or delete {kind}s")
+    entity_parser.set_defaults(handler=handler)
+    actions = entity_parser.add_subparsers(dest="action", required=True)
+    add_parser = actions.add_parser("add", help=f"Create a {kind}")
+    add_parser.add_argument(name_field)
+    actions.add_parser("list", help=f"List every {kind}")
+    rename_parser = actions.add_parser("rename", help=f"Rename a {kind}")
+    rename_parser.add_argument(f"old_{name_field}")
+    rename_parser.add_argument(f"new_{name_field}")
+    delete_parser = actions.add_parser("delete", help=f"Delete a {kind}")
+    delete_parser.add_argument(name_field)
+    delete_many_parser = actions.add_parser("delete-many", help=f"Delete many {kind}s in one transaction")
+    delete_many_parser.add_argument("names", nargs="*", help=f"{kind.capitalize()} {name_field}s")
+    delete_many_parser.add_argument("--file", help=f"File w/ one {name_field} per line ('-' for stdin)")
+    delete_many_parser.add_argument("--like", help=f"Delete every {kind} whose {name_field} matches "
+                                                   f"this SQL LIKE pattern, e.g. 'Live - %%'")
+    rename_many_parser = actions.add_parser("rename-many", help=f"Rename many {kind}s in one transaction")
+    rename_many_parser.add_argument("file", help=f"CSV of old,new {name_field} pairs ('-' for stdin)")
+    entity_parser.set_defaults(kind=kind)
+    return actions
+
+# Open a command's input file - '-' reads stdin
+def open_input(path: str):
+    if path == "-":
+        return open(sys.stdin.fileno(), 'r', encoding='utf-8', closefd=False)
+    return open(path, 'r', encoding='utf-8', newline='')
+
+# Command line arguments - no command starts the interactive menus
+def build_parser():
+    parser = argparse.ArgumentParser(description="Manage your music library.")
+    parser.add_argument("--profile", choices=list(CONNECTION_PROFILES), default="durable",
+                        help="SQLite connection profile (default: durable)")
+    parser.add_argument("--slow-query-ms", type=float, default=None,
+                        help="Turn on instrumentation & log calls slower than this")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                        help="Output format for commands (default: table)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    add_entity_parser(subparsers, "artist", "name", MusicManager.command_artist)
+    add_entity_parser(subparsers, "category", "name", MusicManager.command_category)
+    album_actions = add_entity_parser(subparsers, "album", "title", MusicManager.command_album)
+    album_actions.choices["add"].add_argument("year", type=int)
+    album_actions.choices["rename"].add_argument("--year", type=int, default=None,
+                                                 help="New release year (default: unchanged)")
+
+    song_actions = add_entity_parser(subparsers, "song", "title", MusicManager.command_song)
+    song_actions.choices["list"].add_argument("--limit", type=int, default=None,
+                                              help="Only list the first LIMIT songs")
+    link_parser = song_actions.add_parser("link", help="Link a song to artists, albums & categories")
+    link_parser.add_argument("title")
+    for links in (song_actions.choices["add"], link_parser):
+        links.add_argument("--artist", action="append", default=[], help="Artist name (repeatable)")
+        links.add_argument("--album", action="append", default=[], help="Album title (repeatable)")
+        links.add_argument("--category", action="append", default=[], help="Category name (repeatable)")
+
+    report_parser = subparsers.add_parser("report", help="Run a report")
+    report_parser.set_defaults(handler=MusicManager.command_report)
+    reports = report_parser.add_subparsers(dest="report", required=True)
+    reports.add_parser("by-artist", help="Songs played by an artist").add_argument("name")
+    reports.add_parser("by-year", help="Artists w/ albums in a year").add_argument("year", type=int)
+    reports.add_parser("by-category", help="Albums w/ songs in a category").add_argument("name")
+    for cube_report in (reports.choices["by-year"], reports.choices["by-category"]):
+        cube_report.add_argument("--allow-stale", action="store_true",
+                                 help="Answer from the report cube without refreshing it first")
+    for report in reports.choices.values():
+        report.add_argument("--arraysize", type=int, default=None,
+                            help="Rows fetched from SQLite per trip (default: 500)")
+    reports.add_parser("discography", help="An artist's songs by album w/ years & categories").add_argument("name")
+    all_reports = reports.add_parser("all", help="Every by-year & by-category report, in parallel")
+    all_reports.add_argument("--workers", type=int, default=None,
+                             help="Worker processes (default: one per CPU)")
+    all_reports.add_argument("--no-compare", action="store_true",
+                             help="Skip the serial run used to measure the speedup")
+    all_reports.add_argument("--refresh-cubes", action="store_true",
+                             help="Refresh dirty cube slices before running")
+
+    cubes_parser = subparsers.add_parser("cubes", help="Show the report cubes behind by-year & by-category")
+    cubes_parser.set_defaults(handler=MusicManager.command_cubes)
+    cubes_parser.add_argument("--refresh", action="store_true", help="Refresh every dirty slice")
+    cubes_parser.add_argument("--rebuild", action="store_true", help="Recompute the cubes from scratch")
+
+    search_parser = subparsers.add_parser("search", help="Search every name in the library")
+    search_parser.set_defaults(handler=MusicManager.command_search)
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=20)
+
+    subparsers.add_parser("pragmas", help="Show the connection PRAGMAs in effect").set_defaults(
+        handler=MusicManager.command_pragmas)
+
+    maintenance_parser = subparsers.add_parser("maintenance", help="Page usage report & VACUUM/ANALYZE")
+    maintenance_parser.set_defaults(handler=MusicManager.command_maintenance)
+    maintenance_parser.add_argument("--run", action="store_true",
+                                    help="PRAGMA optimize, then reclaim free pages if worth it")
+    maintenance_parser.add_argument("--analyze", action="store_true", help="Refresh planner statistics")
+    maintenance_parser.add_argument("--incremental-vacuum", action="store_true",
+                                    help="Reclaim every free page (auto_vacuum=INCREMENTAL only)")
+    maintenance_parser.add_argument("--vacuum", action="store_true", help="Rebuild the whole file")
+    maintenance_parser.add_argument("--auto-vacuum", type=str.upper, choices=["NONE", "FULL", "INCREMENTAL"],
+                                    help="Switch auto_vacuum mode (rebuilds the file)")
+
+    orphans_parser = subparsers.add_parser("orphans", help="Find junction rows pointing at deleted rows")
+    orphans_parser.set_defaults(handler=MusicManager.command_orphans)
+    orphans_parser.add_argument("--purge", action="store_true", help="Delete them too")
+
+    summary_parser = subparsers.add_parser("song-summary", help="Verify the SongSummary table")
+    summary_parser.set_defaults(handler=MusicManager.command_song_summary)
+    summary_parser.add_argument("--rebuild", action="store_true",
+                                help="Recompute SongSummary from the live tables first")
+
+    import_parser = subparsers.add_parser("import", help="Bulk import a .jsonl or .csv catalog")
+    import_parser.set_defaults(handler=MusicManager.command_import)
+    import_parser.add_argument("file", help="Path to the .jsonl or .csv file")
+    import_parser.add_argument("--batch-size", type=int, default=1000,
+                               help="Rows written per executemany batch (default: 1000)")
+    import_parser.add_argument("--cache-size", type=int, default=100000,
+                               help="Names kept in memory per table (default: 100000)")
+    import_parser.add_argument("--separator", default=";",
+                               help="Separator for several names in one column (default: ;)")
+
+    export_parser = subparsers.add_parser("export", help="Export every song to a .csv, .jsonl or .mcol file")
+    export_parser.set_defaults(handler=MusicManager.command_export)
+    export_parser.add_argument("file", help="Path to write - a .gz suffix compresses csv & jsonl")
+    export_parser.add_argument("--file-format", choices=EXPORT_FORMATS,
+                               help="Export format (default: from the file extension)")
+    export_parser.add_argument("--chunk-size", type=int, default=10000,
+                               help="Songs read per chunk (default: 10000)")
+    export_parser.add_argument("--separator", default=";",
+                               help="Separator for several names in one csv column (default: ;)")
+
+    batch_parser = subparsers.add_parser("batch", help="Run commands read from a file or stdin")
+    batch_parser.add_argument("file", nargs="?", default="-",
+                              help="File w/ one command per line (default: stdin)")
+    batch_parser.add_argument("--stop-on-error", action="store_true",
+                              help="Stop at the first command that fails")
+    return parser
+
 def main():
-    instance = MusicManager()
+    parser = build_parser()
+    args = parser.parse_args()
+    status = sys.stderr if args.command is not None else sys.stdout
+    try:
+        instance = MusicManager(args.profile, args.slow_query_ms, status)
+    except RuntimeError as e:
+        # e.g. Python's SQLite is too old or lacks FTS5 (see check_sqlite)
+        print(f"error: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+    if args.command is not None:
+        fmt = args.format or "table"
+        if args.command == "batch":
+            with (sys.stdin if args.file == "-" else open(args.file, 'r')) as lines:
+                ok = instance.run_batch(lines, parser, fmt, args.stop_on_error)
+        else:
+            ok = instance.run_command(args, fmt)
+        instance.db.close()
+        raise SystemExit(0 if ok else 1)
+
     instance.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import MusicDatabase
+
+# Report runner - runs the year report for every album year & the category
+# report for every category across a pool of worker processes
+#
+#   results = run_all_reports(db, workers=8)
+#   results["reports"][("year", 1975)]      # -> [("Queen",), ...]
+#   results["reports"][("category", "Rock")] # -> [("A Night at the Opera", "Queen"), ...]
+#
+# Every worker opens its own read-only (mode=ro) connection w/ the
+# read-only-analytics profile, so the reports run on as many cores as there
+# are workers w/o ever contending for the writer. Read-only connections can't
+# refresh a dirty cube slice - they answer it w/ the live query instead (see
+# MusicDatabase._cube_query), so results are always current.
+
+# Connection profile every report connection is opened with
+RUNNER_PROFILE = "read-only-analytics"
+
+# The calling worker process's database - opened once per process by _open_worker
+_worker_db = None
+
+# ===================== Workers =====================
+
+def _open_worker(db_name: str):
+    # Process pool initializer - open this worker's read-only database
+    global _worker_db
+    _worker_db = MusicDatabase(db_name, profile=RUNNER_PROFILE)
+    _worker_db.connect()
+
+def _run_task(task: tuple):
+    # Run one (kind, key) report in a worker process
+    kind, key = task
+    return kind, key, run_report(_worker_db, kind, key)
+
+def run_report(db: MusicDatabase, kind: str, key):
+    # Rows of one report as plain tuples (cheap to send between processes)
+    # w/ any duplicates dropped, first occurrence kept
+    if kind == "year":
+        rows = db.see_all_artists_with_albums_in_year(key, row_format="tuple")
+    elif kind == "category":
+        rows = db.see_all_albums_in_category(key, row_format="tuple")
+    else:
+        raise ValueError(f"Unknown report kind '{kind}' (expected 'year' or 'category')")
+    return list(dict.fromkeys(rows))
+
+# ===================== Running =====================
+
+def report_tasks(db: MusicDatabase):
+    # (kind, key) for every report the nightly run needs
+    years = db.get_album_years()
+    categories = [name for (category_id, name) in db.get_all_categories(row_format="tuple")]
+    return [("year", year) for year in years] + [("category", name) for name in categories]
+
+def run_serial(db_name: str, tasks: list):
+    # Run every report one after another on a single read-only connection
+    db = MusicDatabase(db_name, profile=RUNNER_PROFILE)
+    db.connect()
+    try:
+        return [(kind, key, run_report(db, kind, key)) for kind, key in tasks]
+    finally:
+        db.close()
+
+def run_parallel(db_name: str, tasks: list, workers: int, chunksize: int = 1):
+    # Fan the reports out over a process pool - results come back in task order
+    # Workers are spawned rather than forked so no SQLite handle from this
+    # process is ever inherited by a child
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_open_worker, initargs=(db_name,)) as pool:
+        return list(pool.map(_run_task, tasks, chunksize=chunksize))
+
+def merge_results(results: list):
+    # Combine per-report results - every report's rows plus the distinct
+    # artists across all years & distinct (album, artist) pairs across all categories
+    reports = {}
+    artists = set()
+    albums = set()
+    for kind, key, rows in results:
+        reports[(kind, key)] = rows
+        if kind == "year":
+            artists.update(artist for (artist,) in rows)
+        else:
+            albums.update(rows)
+    return {"reports": reports, "artists": sorted(artists), "albums": sorted(albums)}
+
+def run_all_reports(db: MusicDatabase, workers: int = None, compare: bool = True,
+                    refresh_cubes: bool = False, chunksize: int = None):
+    # Run every year & category report in parallel & merge the results
+    # compare also runs them serially on one connection to measure the speedup
+    # (& checks both runs agree). refresh_cubes refreshes dirty cube slices
+    # through db's writer first - otherwise workers answer them live.
+    if refresh_cubes:
+        db.refresh_report_cubes()
+    tasks = report_tasks(db)
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    # A few batches per worker keeps them all busy w/o a round trip per report
+    chunksize = chunksize or max(1, len(tasks) // (workers * 4))
+
+    start = time.perf_counter()
+    results = run_parallel(db.db_name, tasks, workers, chunksize)
+    parallel_seconds = time.perf_counter() - start
+
+    stats = {
+        "tasks": len(tasks),
+        "workers": workers,
+        "parallel_seconds": parallel_seconds,
+        "serial_seconds": None,
+        "speedup": None,
+        "matches": None,
+    }
+    if compare:
+        start = time.perf_counter()
+        serial = run_serial(db.db_name, tasks)
+        stats["serial_seconds"] = time.perf_counter() - start
+        stats["speedup"] = stats["serial_seconds"] / parallel_seconds if parallel_seconds > 0 else None
+        stats["matches"] = serial == results
+
+    stats.update(merge_results(results))
+    return stats